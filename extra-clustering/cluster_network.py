@@ -1,5 +1,7 @@
 import csv
 import sys
+sys.path.append('../')
+import graphs as gr
 import numpy as np
 import networkx as nx
 from haversine import haversine
@@ -55,6 +57,44 @@ def mk_routegraph(routeset, airportdic):
     return G
 
 
+def mk_routedigraph(ROUTES_FILE, airportdic):
+    """
+    Builds the directed flight graph, one labelled edge per airline flying a route.
+
+    Args:
+        ROUTES_FILE: the routes.dat file
+        airportdic: the airports, from mk_airportdict
+
+    Returns:
+        a graphs.MultiDiGraph with the airport ids as vertices and the distances (km) as weights
+    """
+    G = gr.MultiDiGraph()
+    for airport in airportdic:
+        G.add_vertex(airport)
+        G.set_vertex_value(airport, airportdic[airport]['posi'])
+
+    with open(ROUTES_FILE, 'r', encoding='utf-8') as csvfile:
+        for line in csv.reader(csvfile):
+            start, stop = line[3], line[5]
+            if start in airportdic and stop in airportdic:
+                new = G.multiplicity(start, stop) == 0
+                G.add_edge(start, stop, label=line[0])
+                if new:
+                    dis = round(haversine(airportdic[start]['posi'], airportdic[stop]['posi']), 2)
+                    G.set_weight(start, stop, dis)
+    return G
+
+
+def shortest_flight(G, start, stop):
+    "Prints the shortest flight path between two airports and the airlines of each leg."
+    path = gr.dijkstra(G, start, weight='weight', target=stop).path(stop)
+    if path is None:
+        print('No flights from', start, 'to', stop)
+        return
+    for a, b in zip(path, path[1:]):
+        print(a, '->', b, G.get_weight(a, b), 'km', ','.join(sorted(set(G.edge_labels(a, b)))))
+
+
 def plt_airport(G):
     lat = [G.nodes[node]['posi'][0] for node in list(G.nodes)]
     lon = [G.nodes[node]['posi'][1] for node in list(G.nodes)]
@@ -133,6 +173,9 @@ if __name__ == '__main__':
     if comm_pare[1] == 'span':
         k_spanning_tree(G, k = int(comm_pare[2]))
     
+    if comm_pare[1] == 'flight':
+        shortest_flight(mk_routedigraph(ROUTES_FILE, airportdic), comm_pare[2], comm_pare[3])
+
     if comm_pare[1] == 'means':
         lat = [G.nodes[node]['posi'][0] for node in list(G.nodes)]
         lon = [G.nodes[node]['posi'][1] for node in list(G.nodes)]
@@ -6,14 +6,14 @@ colors = ['pink', 'lightgreen', 'lightblue', 'yellow', 'orange']
 
 def simplyfy(graph, n=4):
     stack = list()
-    while graph.vertices():
-        num_vtx = len(graph.vertices())
+    while len(graph):
+        num_vtx = len(graph)
         for vtx in graph.vertices():
             neighbours = graph.neighbours(vtx)
             if len(neighbours) < n:
                 stack.append((vtx, neighbours))
                 graph.remove_vertex(vtx)
-        assert num_vtx != len(graph.vertices()), "Input graph cannot be simplyfied with n = {nn}".format(nn=n)
+        assert num_vtx != len(graph), "Input graph cannot be simplyfied with n = {nn}".format(nn=n)
     return stack
         
 
@@ -1,7 +1,26 @@
 from django import forms
 from .models import Route
+from .utils.tramviz import tram_network
 
 class RouteForm(forms.ModelForm):
     class Meta:
         model = Route
-        fields = ('dep', 'dest',)
\ No newline at end of file
+        fields = ('dep', 'dest',)
+
+    def clean_stop(self, field):
+        # the stop meant by the name in any case and with or without diacritics, or a few suggestions for a typo
+        name = self.cleaned_data[field]
+        network = tram_network()
+        stop = network.find_stop(name)
+        if stop is None:
+            similar = network.similar_stops(name)
+            if similar:
+                raise forms.ValidationError('Unknown stop {}, did you mean {}?'.format(name, ' or '.join(similar[:3])))
+            raise forms.ValidationError('Unknown stop {}'.format(name))
+        return stop
+
+    def clean_dep(self):
+        return self.clean_stop('dep')
+
+    def clean_dest(self):
+        return self.clean_stop('dest')
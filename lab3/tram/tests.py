@@ -1,3 +1,69 @@
 from django.test import TestCase
 
-# Create your tests here.
+from .utils.trams import TramNetwork, specialize_stops_to_lines, specialized_transition_time, specialized_geo_distance
+
+# two lines crossing at C, and line 3 riding along line 1 from A to C
+LINES = {'1': ['A', 'B', 'C', 'D'], '2': ['E', 'C', 'F'], '3': ['A', 'C']}
+STOPS = {stop: {'lat': 57.7 + i / 100, 'lon': 11.9 + i / 100} for i, stop in enumerate('ABCDEF')}
+TIMES = {'A': {'B': 2, 'C': 5}, 'B': {'A': 2, 'C': 2}, 'C': {'A': 5, 'B': 2, 'D': 3, 'E': 1, 'F': 4},
+         'D': {'C': 3}, 'E': {'C': 1}, 'F': {'C': 4}}
+
+
+class SpecializedNetworkTest(TestCase):
+
+    def setUp(self):
+        self.network = TramNetwork(LINES, STOPS, TIMES)
+
+    def test_vertices_and_edges(self):
+        spec = specialize_stops_to_lines(self.network)
+        self.assertEqual(len(spec), sum(len(stops) for stops in LINES.values()))
+        # the rides, and the changes at A (1, 3) and C (1, 2, 3)
+        self.assertEqual(spec.number_of_edges(), 3 + 2 + 1 + 1 + 3)
+        a1, c1, c2 = spec.vertex('A', '1'), spec.vertex('C', '1'), spec.vertex('C', '2')
+        self.assertEqual((spec.stop_of(c2), spec.line_of(c2)), ('C', '2'))
+        self.assertEqual(specialized_transition_time(spec, c1, c2), 10)
+        self.assertEqual(specialized_transition_time(spec, c1, c2, changetime=3), 3)
+        self.assertEqual(specialized_transition_time(spec, a1, spec.vertex('B', '1')), 2)
+
+    def test_route(self):
+        spec = specialize_stops_to_lines(self.network)
+        path, time = spec.route('B', 'F')
+        self.assertEqual(path, [('B', '1'), ('C', '1'), ('C', '2'), ('F', '2')])
+        self.assertEqual(time, 2 + 10 + 4)
+        # the costs are those of specialized_transition_time and specialized_geo_distance along the route
+        for by, cost in [('time', specialized_transition_time), ('geo', specialized_geo_distance)]:
+            for change in [None, 3]:
+                path, total = spec.route('B', 'F', by=by, change=change)
+                vertices = [spec.vertex(stop, line) for stop, line in path]
+                args = () if change is None else (change,)
+                self.assertAlmostEqual(total, sum(cost(spec, u, v, *args) for u, v in zip(vertices, vertices[1:])))
+        # without a cost for changing, the routes are as quick as on the stops
+        for a in STOPS:
+            for b in STOPS:
+                if a != b:
+                    self.assertEqual(spec.route(a, b, change=0)[1], self.network.quickest_route(a, b)[1])
+
+    def test_cached(self):
+        spec = specialize_stops_to_lines(self.network)
+        self.assertIs(specialize_stops_to_lines(self.network), spec)
+        # line 3 only rides along the other lines, but the specialized network changes
+        self.network.remove_lines(['3'])
+        spec = specialize_stops_to_lines(self.network)
+        self.assertEqual(spec.stop_vertices('A'), [spec.vertex('A', '1')])
+
+
+class StopNameTest(TestCase):
+
+    def setUp(self):
+        self.network = TramNetwork({'1': ['Östra Sjukhuset', 'Chalmers', 'Chalmers Tvärgata']},
+                                   {stop: STOPS[key] for stop, key in [('Östra Sjukhuset', 'A'), ('Chalmers', 'B'), ('Chalmers Tvärgata', 'C')]},
+                                   {'Östra Sjukhuset': {'Chalmers': 3}, 'Chalmers': {'Östra Sjukhuset': 3, 'Chalmers Tvärgata': 1},
+                                    'Chalmers Tvärgata': {'Chalmers': 1}})
+
+    def test_find_stop(self):
+        self.assertEqual(self.network.find_stop('ostra  SJUKHUSET'), 'Östra Sjukhuset')
+        self.assertEqual(self.network.find_stop('Chalmers'), 'Chalmers')
+        self.assertIsNone(self.network.find_stop('Chalmrs'))
+        self.assertEqual(self.network.stops_with_prefix('chalmers'), ['Chalmers', 'Chalmers Tvärgata'])
+        self.assertEqual(self.network.similar_stops('Chalmrs'), ['Chalmers'])
+        self.assertEqual(self.network.similar_stops('chalmers tvargatan', max_distance=1), ['Chalmers Tvärgata'])
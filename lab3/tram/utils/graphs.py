@@ -1,17 +1,48 @@
 # TODO: mock-up to be replaced by your file from Lab 2
 
 import graphviz
-from queue import PriorityQueue
+import json
+import math
+import sys
+import unicodedata
+import numpy as np
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import deque
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor
+from heapq import heappush, heappop
+from time import perf_counter
 
 class Graph:
     """
     A class of undirected graphs.
     Internal representation:
-        {node: {'_value': None, neighbour1: {}, neighbour2: {}, ...}, ...}
+        _adjlist: {node: {neighbour1: edge id, neighbour2: edge id, ...}, ...}
+        _vids: {node: vertex id}
+        _values: [value of vertex 0, value of vertex 1, ...], None at first
+        _edge_columns: {attribute: array indexed by edge id}, e.g. the 'weight' column (nan if not set)
+    The attributes are stored in columns, apart from the adjacency, and each undirected edge has one id
+    shared by both directions. The ids of removed vertices and edges are reused.
+    The number of edges is maintained, and the sorted views given by neighbours(), edges() and freeze()
+    are cached: _version counts the mutations, and the cached neighbours of a vertex are dropped when it changes.
+    The connected components are a union-find forest over the vertex ids (_parent), joined when edges are
+    added and built again, on the next lookup, after a removal.
     """
     def __init__(self, start=None):
         "Start with an input list of edges or an empty graph, values are set to be None at first."
         self._adjlist = dict()
+        self._vids = dict()
+        self._values = list()
+        self._free_vids = list()
+        self._edge_columns = {'weight': array('d')}
+        self._free_eids = list()
+        self._num_edges = 0
+        self._version = 0
+        self._sorted_nbs = dict()
+        self._cache = dict()
+        self._parent = list()
+        self._components_valid = True
         if start:
             for a, b in start:
                 self.add_edge(a,b)
@@ -21,86 +52,244 @@ class Graph:
         return len(self._adjlist.keys())
 
     def __getitem__(self, v):
-        "Gives the neighbours and value (more info can be added, e.g. weight) of vertex v."
-        return self._adjlist[v]
+        "Gives the neighbours and value (and the weights) of vertex v, as a dictionary built on demand."
+        item = {'_value': self._values[self._vids[v]]}
+        for nb, eid in self._adjlist[v].items():
+            weight = self._edge_columns['weight'][eid]
+            item[nb] = dict() if weight != weight else {'weight': weight}
+        return item
+
+    def __contains__(self, v):
+        "Checks if v is a vertex of the graph."
+        return v in self._adjlist
     
     def __str__(self):
         "Shows the adjacency list."
-        st = [str(key)+' - '+str(self._adjlist[key]) for key in self._adjlist.keys()]
+        st = [str(key)+' - '+str(self[key]) for key in self._adjlist.keys()]
         return '\n'.join(st)
 
     def vertices(self):
         "Lists all vertices."
         return list(self._adjlist.keys())
 
+    def number_of_edges(self):
+        "Return the number of edges."
+        return self._num_edges
+
+    def _cached(self, key, build):
+        "Returns the cached result of build(), built again if the graph has changed since."
+        version, value = self._cache.get(key, (None, None))
+        if version != self._version:
+            value = build()
+            self._cache[key] = (self._version, value)
+        return value
+
+    def _changed(self, *vertices):
+        "Called by every mutation, drops the cached views of the changed vertices."
+        self._version += 1
+        for v in vertices:
+            self._sorted_nbs.pop(v, None)
+
     def edges(self):
         "Lists all edges in one direcion (sorted)."
-        edges = set()
+        return list(self._cached('edges', self._sorted_edges))
+
+    def _sorted_edges(self):
+        edges = list()
         for a in self._adjlist:
             for b in self._adjlist[a]:
-                if b == '_value':
-                    continue
                 if a <= b:
-                    edges.add((a, b))
-                else:
-                    edges.add((b, a))
-        edges = list(edges)
+                    edges.append((a, b))
         edges.sort(key=lambda a: (a[0], a[1]))
         return edges
     
     def add_vertex(self, a):
         "Adds a vertex if not exist."
         if a not in self._adjlist:
-            self._adjlist[a] = {'_value': None}
+            self._adjlist[a] = dict()
+            if self._free_vids:
+                self._vids[a] = self._free_vids.pop()
+                self._values[self._vids[a]] = None
+                self._parent[self._vids[a]] = self._vids[a]
+            else:
+                self._vids[a] = len(self._values)
+                self._values.append(None)
+                self._parent.append(self._vids[a])
+            self._changed(a)
     
     def add_edge(self, a, b):
-        "Adds an edge, and the vertices if needed."
+        "Adds an edge, and the vertices if needed (the attributes of an existing edge are cleared)."
         self.add_vertex(a)
-        self._adjlist[a][b] = dict()
         self.add_vertex(b)
-        self._adjlist[b][a] = dict()
+        if b in self._adjlist[a]:
+            eid = self._adjlist[a][b]
+            self._clear_edge(eid)
+        else:
+            eid = self._new_edge_id()
+            self._num_edges += 1
+            self._union(a, b)
+        self._adjlist[a][b] = eid
+        self._adjlist[b][a] = eid
+        self._changed(a, b)
+
+    def _new_edge_id(self):
+        "Returns an unused edge id, with its attributes cleared."
+        if self._free_eids:
+            eid = self._free_eids.pop()
+        else:
+            eid = len(self._edge_columns['weight'])
+            for column in self._edge_columns.values():
+                column.append(float('nan'))
+        self._clear_edge(eid)
+        return eid
+
+    def _clear_edge(self, eid):
+        for column in self._edge_columns.values():
+            column[eid] = float('nan')
+
+    def is_directed(self):
+        "An undirected graph."
+        return False
+
+    def _find(self, i):
+        "The root of the vertex id i in the union-find forest (halving the path on the way)."
+        parent = self._parent
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def _union(self, a, b):
+        "Joins the components of the vertices a and b."
+        if self._components_valid:
+            ra, rb = self._find(self._vids[a]), self._find(self._vids[b])
+            if ra != rb:
+                self._parent[rb] = ra
+
+    def _component_roots(self):
+        "Builds the forest again if vertices or edges have been removed since it was last built."
+        if not self._components_valid:
+            self._parent = list(range(len(self._values)))
+            self._components_valid = True
+            for a in self._adjlist:
+                for b in self._adjlist[a]:
+                    self._union(a, b)
+        return self._find
+
+    def same_component(self, a, b):
+        "Tells if a and b are in the same connected component (for a directed graph, the same weak component)."
+        if a not in self._adjlist or b not in self._adjlist:
+            return False
+        find = self._component_roots()
+        return find(self._vids[a]) == find(self._vids[b])
+
+    def components(self):
+        "Lists the connected components as sets of vertices, the largest first."
+        find = self._component_roots()
+        groups = dict()
+        for v in self._adjlist:
+            groups.setdefault(find(self._vids[v]), set()).add(v)
+        return sorted(groups.values(), key=len, reverse=True)
 
     def neighbours(self, v):
         "Lists all neighbours of v (sorted)."
         if v in self._adjlist:
-            nbs = [vtx for vtx in self._adjlist[v].keys() if vtx != '_value']
-            nbs.sort()
-            return nbs
+            if v not in self._sorted_nbs:
+                self._sorted_nbs[v] = sorted(self._adjlist[v])
+            return list(self._sorted_nbs[v])
         return "{} is not in the current graph".format(v)
 
+    def adjacent(self, v):
+        "Iterates over the neighbours of v (unsorted, no copy), used by the search functions."
+        return iter(self._adjlist[v])
+
+    def weighted_adjacent(self, v, attr='weight'):
+        "Iterates over (neighbour, attribute of the edge) pairs of v, read directly from the attribute column."
+        if attr not in self._edge_columns:
+            raise ValueError("The graph has no edge attribute {}".format(attr))
+        column = self._edge_columns[attr]
+        for vtx, eid in self._adjlist[v].items():
+            value = column[eid]
+            if value != value:
+                raise _unset_attribute(attr, v, vtx)
+            yield vtx, value
+
+    def get_edge_attribute(self, a, b, attr):
+        "Returns an attribute of the edge a -> b, e.g. 'distance', None if it has not been set."
+        if attr in self._edge_columns and a in self._adjlist and b in self._adjlist[a]:
+            value = self._edge_columns[attr][self._adjlist[a][b]]
+            if value == value:
+                return value
+        return None
+
+    def set_edge_attribute(self, a, b, attr, value):
+        "Sets a numeric attribute of the edge a -> b, a new attribute gets a column where the other edges are unset."
+        self.set_edge_attributes([(a, b)], attr, [value])
+
+    def set_edge_attributes(self, edges, attr, values):
+        "Sets an attribute of many edges at once, edges that are not in the graph are skipped."
+        column = self._edge_columns.get(attr)
+        if column is None:
+            column = self._edge_columns[attr] = array('d', [math.nan]) * len(self._edge_columns['weight'])
+        for (a, b), value in zip(edges, values):
+            if a in self._adjlist and b in self._adjlist[a]:
+                column[self._adjlist[a][b]] = value
+        self._changed()
+
     def remove_edge(self, a, b):
         "Removes edge a -> b and b -> a."
-        if a in self._adjlist:
-            if b in self._adjlist[a]:
-                del self._adjlist[a][b]
-        if b in self._adjlist:
-            if a in self._adjlist[b]:
-                del self._adjlist[b][a]
+        if a in self._adjlist and b in self._adjlist[a]:
+            self._free_eids.append(self._adjlist[a].pop(b))
+            self._adjlist[b].pop(a, None)
+            self._num_edges -= 1
+            self._components_valid = False
+            self._changed(a, b)
 
     def remove_vertex(self, v):
-        "Removes a vertex v, also the edges with this vertex."
+        "Removes a vertex v, also the edges with this vertex (only the neighbours of v are visited)."
         if v in self._adjlist:
+            nbs = list(self._adjlist[v])
+            for vtx in nbs:
+                self._free_eids.append(self._adjlist[vtx].pop(v))
             del self._adjlist[v]
-        for vtx in self._adjlist:
-            if v in self._adjlist[vtx]:
-                del self._adjlist[vtx][v]
+            self._free_vids.append(self._vids.pop(v))
+            self._num_edges -= len(nbs)
+            self._components_valid = False
+            self._changed(v, *nbs)
+
+    def freeze(self):
+        "Returns an immutable compressed sparse row (CSR) snapshot of the graph, see FrozenGraph (cached until the graph changes)."
+        return self._cached('frozen', lambda: FrozenGraph(self))
 
     def set_vertex_value(self, v, x):
         "Sets the value of the vertex v to be x."
         if v in self._adjlist:
-            self._adjlist[v]['_value'] = x
+            self._values[self._vids[v]] = x
+            self._changed()
 
     def get_vertex_value(self, v):
         "Returns the value of the vertex v."
         if v in self._adjlist:
-            return self._adjlist[v]['_value']
+            return self._values[self._vids[v]]
         return "{} is not in the current graph".format(v)
 
+    def set_vertex_values(self, vertices, values):
+        "Sets the values of many vertices at once."
+        for v, x in zip(vertices, values):
+            if v in self._adjlist:
+                self._values[self._vids[v]] = x
+        self._changed()
+
+    def vertex_values(self, vertices=None):
+        "Lists the values of the given vertices (all vertices by default)."
+        if vertices is None:
+            vertices = self._adjlist
+        return [self._values[self._vids[v]] for v in vertices]
+
 class WeightedGraph(Graph):
     """
     A class of weighted undirected graphs.
-    Internal representation:
-        {node: {'_value': None, neighbour1: {'weight': None}, neighbour2: {'weight': None}...}, ...}
+    Internal representation: as Graph, the weights are stored in the 'weight' column (nan if not set)
     """
     def __init__(self, start=None):
         "Start with an input list of edges or an empty graph, weights are set to be None at first."
@@ -110,68 +299,1436 @@ class WeightedGraph(Graph):
         "Returns the weight of an edge a -> b."
         if a in self._adjlist:
             if b in self._adjlist[a]:
-                if 'weight' in self._adjlist[a][b]:
-                    return self._adjlist[a][b]['weight']
-                return "The weight between {} and {} has not been set"
+                weight = self._edge_columns['weight'][self._adjlist[a][b]]
+                if weight == weight:
+                    return weight
+                return "The weight between {} and {} has not been set".format(a,b)
             return "Vertex {} does not have an neighbour {}".format(a,b)
         return "{} is not in the current graph".format(a)
     
     def set_weight(self, a, b, weight):
         "Sets the weight of edge a -> b."
-        if a in self._adjlist and b in self._adjlist:
-            if a in self._adjlist[b] and b in self._adjlist[a]:
-                self._adjlist[a][b]['weight'] = weight
-                self._adjlist[b][a]['weight'] = weight
+        if a in self._adjlist and b in self._adjlist[a]:
+            self._edge_columns['weight'][self._adjlist[a][b]] = weight
+            self._changed()
+
+    def set_weights(self, edges, weights):
+        "Sets the weights of many edges at once, edges that are not in the graph are skipped."
+        column = self._edge_columns['weight']
+        for (a, b), weight in zip(edges, weights):
+            if a in self._adjlist and b in self._adjlist[a]:
+                column[self._adjlist[a][b]] = weight
+        self._changed()
+
+    def weights_array(self, edges=None):
+        "Returns the weights of the given edges (all edges in the order of edges() by default) as a numpy array."
+        if edges is None:
+            edges = self.edges()
+        column = self._edge_columns['weight']
+        return np.array([column[self._adjlist[a][b]] for a, b in edges], dtype=float)
+
+
+class DiGraph(WeightedGraph):
+    """
+    A class of weighted directed graphs, where each edge can carry a label (e.g. an airline).
+    Internal representation: as Graph, but
+        _adjlist: {node: {successor1: edge id, ...}, ...} only has the edges going out of a node,
+        _radjlist: {node: {predecessor1: edge id, ...}, ...} has the edges coming in,
+        _labels: [labels of edge 0, labels of edge 1, ...], a list of labels per edge id
+    The search functions follow the edges forwards, neighbours() lists the successors.
+    """
+    def __init__(self, start=None):
+        "Start with an input list of edges (a, b) from a to b or an empty graph."
+        self._radjlist = dict()
+        self._labels = list()
+        super().__init__(start)
+
+    def is_directed(self):
+        "A directed graph."
+        return True
+
+    def _sorted_edges(self):
+        edges = [(a, b) for a in self._adjlist for b in self._adjlist[a]]
+        edges.sort(key=lambda a: (a[0], a[1]))
+        return edges
+
+    def add_vertex(self, a):
+        "Adds a vertex if not exist."
+        if a not in self._adjlist:
+            self._radjlist[a] = dict()
+        super().add_vertex(a)
+
+    def add_edge(self, a, b, label=None):
+        "Adds an edge a -> b with an optional label, and the vertices if needed (replaces an existing edge a -> b)."
+        self.add_vertex(a)
+        self.add_vertex(b)
+        if b in self._adjlist[a]:
+            eid = self._adjlist[a][b]
+            self._clear_edge(eid)
+            self._num_edges -= len(self._labels[eid])
+        else:
+            eid = self._new_edge_id()
+            self._union(a, b)
+        self._num_edges += 1
+        if eid == len(self._labels):
+            self._labels.append(None)
+        self._labels[eid] = [label]
+        self._adjlist[a][b] = eid
+        self._radjlist[b][a] = eid
+        self._changed(a, b)
+
+    def predecessors(self, v):
+        "Lists all vertices with an edge to v (sorted)."
+        if v in self._radjlist:
+            return sorted(self._radjlist[v])
+        return "{} is not in the current graph".format(v)
+
+    def reverse_adjacent(self, v):
+        "Iterates over the predecessors of v (unsorted, no copy)."
+        return iter(self._radjlist[v])
+
+    def edge_labels(self, a, b):
+        "Lists the labels of the edges a -> b."
+        if a in self._adjlist and b in self._adjlist[a]:
+            return list(self._labels[self._adjlist[a][b]])
+        return list()
+
+    def remove_edge(self, a, b):
+        "Removes the edge a -> b."
+        if a in self._adjlist and b in self._adjlist[a]:
+            eid = self._adjlist[a].pop(b)
+            del self._radjlist[b][a]
+            self._num_edges -= len(self._labels[eid])
+            self._free_eids.append(eid)
+            self._components_valid = False
+            self._changed(a, b)
+
+    def remove_vertex(self, v):
+        "Removes a vertex v, also the edges from and to v (only the neighbours of v are visited)."
+        if v in self._adjlist:
+            succs = list(self._adjlist[v])
+            preds = list(self._radjlist[v])
+            for b in succs:
+                self.remove_edge(v, b)
+            for a in preds:
+                if a != v:
+                    self.remove_edge(a, v)
+            del self._adjlist[v]
+            del self._radjlist[v]
+            self._free_vids.append(self._vids.pop(v))
+            self._components_valid = False
+            self._changed(v)
+
+
+class MultiDiGraph(DiGraph):
+    """
+    A class of weighted directed graphs with parallel edges, e.g. one edge per airline flying a route.
+    Internal representation: as DiGraph, the parallel edges a -> b share one edge id and its weight,
+    and the labels of that id list one label per parallel edge.
+    """
+    def add_edge(self, a, b, label=None):
+        "Adds one more edge a -> b with an optional label, and the vertices if needed."
+        if a in self._adjlist and b in self._adjlist[a]:
+            self._labels[self._adjlist[a][b]].append(label)
+            self._num_edges += 1
+            self._changed(a, b)
+        else:
+            super().add_edge(a, b, label)
+
+    def multiplicity(self, a, b):
+        "Return the number of parallel edges a -> b."
+        if a in self._adjlist and b in self._adjlist[a]:
+            return len(self._labels[self._adjlist[a][b]])
+        return 0
+
+    def remove_edge(self, a, b, label=None):
+        "Removes all edges a -> b, or only one edge with the given label."
+        if label is not None and a in self._adjlist and b in self._adjlist[a]:
+            labels = self._labels[self._adjlist[a][b]]
+            if label in labels and len(labels) > 1:
+                labels.remove(label)
+                self._num_edges -= 1
+                self._changed(a, b)
+                return
+            if label not in labels:
+                return
+        super().remove_edge(a, b)
+
+
+class FrozenGraph:
+    """
+    An immutable snapshot of a Graph (or WeightedGraph) for read-only workloads.
+    Vertices get integer ids and the adjacency is stored in compressed sparse row (CSR) form.
+    Internal representation:
+        _names: [vertex with id 0, vertex with id 1, ...]
+        _ids: {vertex: id}
+        _values: [value of vertex 0, value of vertex 1, ...]
+        _offsets: array, the neighbours of vertex i are _targets[_offsets[i]:_offsets[i+1]] (sorted)
+        _targets: array of neighbour ids, every undirected edge is stored in both directions
+                  (for a directed graph, the successors)
+        _columns: {attribute: array aligned with _targets}, a copy of every edge column of the graph, nan if not set
+        _weights: the 'weight' column
+        _components: array, the connected component of each vertex id
+    """
+    def __init__(self, graph):
+        "Builds the snapshot from a Graph, later changes of the graph are not seen."
+        self._names = graph.vertices()
+        self._ids = {vtx: i for i, vtx in enumerate(self._names)}
+        self._directed = graph.is_directed()
+        self._values = [graph.get_vertex_value(vtx) for vtx in self._names]
+        self._offsets = array('l', [0])
+        self._targets = array('l')
+        eids = list()
+        for vtx in self._names:
+            adj = graph._adjlist[vtx]
+            for nb in graph.neighbours(vtx):
+                self._targets.append(self._ids[nb])
+                eids.append(adj[nb])
+            self._offsets.append(len(self._targets))
+        self._columns = {attr: array('d', [column[eid] for eid in eids])
+                         for attr, column in graph._edge_columns.items()}
+        self._weights = self._columns['weight']
+        find = graph._component_roots()
+        self._components = array('l', [find(graph._vids[vtx]) for vtx in self._names])
+
+    def __len__(self):
+        "Return the length (number) of vertices."
+        return len(self._names)
+
+    def __contains__(self, v):
+        "Checks if v is a vertex of the graph."
+        return v in self._ids
+
+    def vertices(self):
+        "Lists all vertices."
+        return list(self._names)
+
+    def edges(self):
+        "Lists all edges in one direcion (sorted)."
+        edges = list()
+        for a in self._names:
+            for b in self.adjacent(a):
+                if self._directed or a <= b:
+                    edges.append((a, b))
+        edges.sort(key=lambda a: (a[0], a[1]))
+        return edges
+
+    def neighbours(self, v):
+        "Lists all neighbours of v (sorted)."
+        if v in self._ids:
+            return list(self.adjacent(v))
+        return "{} is not in the current graph".format(v)
+
+    def adjacent(self, v):
+        "Iterates over the neighbours of v."
+        i = self._ids[v]
+        for j in range(self._offsets[i], self._offsets[i+1]):
+            yield self._names[self._targets[j]]
+
+    def weighted_adjacent(self, v, attr='weight'):
+        "Iterates over (neighbour, weight) pairs of v, attr is an edge attribute or an array given by edge_weights."
+        weights = self._weight_array(attr)
+        i = self._ids[v]
+        for j in range(self._offsets[i], self._offsets[i+1]):
+            weight = weights[j]
+            if weight != weight:
+                raise _unset_attribute(attr, v, self._names[self._targets[j]])
+            yield self._names[self._targets[j]], weight
+
+    def get_edge_attribute(self, a, b, attr):
+        "Returns an attribute of the edge a -> b, None if it has not been set."
+        if attr in self._columns and a in self._ids and b in self._ids:
+            i, k = self._ids[a], self._ids[b]
+            for j in range(self._offsets[i], self._offsets[i+1]):
+                if self._targets[j] == k:
+                    value = self._columns[attr][j]
+                    return value if value == value else None
+        return None
+
+    def _weight_array(self, attr):
+        "Checks an attribute name or weight array given to the search functions, returns the array."
+        if isinstance(attr, str):
+            if attr not in self._columns:
+                raise ValueError("The graph has no edge attribute {}".format(attr))
+            return self._columns[attr]
+        if len(attr) != len(self._targets):
+            raise ValueError("The weight array does not match the edges of the graph")
+        return attr
+
+    def get_weight(self, a, b):
+        "Returns the weight of an edge a -> b."
+        if a not in self._ids:
+            return "{} is not in the current graph".format(a)
+        i = self._ids[a]
+        k = self._ids.get(b)
+        for j in range(self._offsets[i], self._offsets[i+1]):
+            if self._targets[j] == k:
+                weight = self._weights[j]
+                if weight != weight:
+                    return "The weight between {} and {} has not been set".format(a,b)
+                return weight
+        return "Vertex {} does not have an neighbour {}".format(a,b)
+
+    def edge_weights(self, cost):
+        "Precomputes cost(a, b) for every stored edge a -> b, as an array that can be given to dijkstra as weight."
+        weights = array('d')
+        for i, a in enumerate(self._names):
+            for j in range(self._offsets[i], self._offsets[i+1]):
+                weights.append(cost(a, self._names[self._targets[j]]))
+        return weights
+
+    def get_vertex_value(self, v):
+        "Returns the value of the vertex v."
+        if v in self._ids:
+            return self._values[self._ids[v]]
+        return "{} is not in the current graph".format(v)
+
+    def freeze(self):
+        "The snapshot is already frozen."
+        return self
+
+    def is_directed(self):
+        "Tells if the frozen graph was directed."
+        return self._directed
+
+    def same_component(self, a, b):
+        "Tells if a and b are in the same connected component (for a directed graph, the same weak component)."
+        if a not in self._ids or b not in self._ids:
+            return False
+        return self._components[self._ids[a]] == self._components[self._ids[b]]
+
+
+class SearchStats:
+    """
+    Counters of the work done by the search functions, given to them with stats=.
+    The counters add up over all searches using the same object, last holds the counters of the last search.
+    Counters:
+        searches: number of searches
+        settled: vertices settled (or visited by bfs)
+        pushes, pops: heap (or queue) operations
+        relaxations: edges looked at from a settled vertex
+        cost_calls: calls of the cost function (0 when the weights are read from the graph)
+        search_time, path_time: seconds spent searching and building paths
+    Hooks, e.g. a profiler or a metrics exporter, can subscribe to be called as
+    hook(engine, phase, counters) after each phase ('search' or 'path') of a search.
+    """
+    COUNTERS = ('searches', 'settled', 'pushes', 'pops', 'relaxations', 'cost_calls', 'search_time', 'path_time')
+
+    def __init__(self):
+        for counter in self.COUNTERS:
+            setattr(self, counter, 0)
+        self.last = dict()
+        self._hooks = list()
+        self._calls = 0
+
+    def __str__(self):
+        "Shows the counters."
+        return ', '.join('{}: {}'.format(counter, getattr(self, counter)) for counter in self.COUNTERS)
+
+    def as_dict(self):
+        "Returns the counters as a dictionary."
+        return {counter: getattr(self, counter) for counter in self.COUNTERS}
+
+    def subscribe(self, hook):
+        "Calls hook(engine, phase, counters) after each phase of every search."
+        self._hooks.append(hook)
 
+    def unsubscribe(self, hook):
+        "Stops calling hook."
+        self._hooks.remove(hook)
 
-def dijkstra(graph, source, cost=lambda u,v: 1):
+    def _count_calls(self, cost):
+        "Wraps the cost function so that its calls are counted for the current search."
+        self._calls = 0
+        def counted(u, v):
+            self._calls += 1
+            return cost(u, v)
+        return counted
+
+    def _record(self, engine, settled=0, pushes=0, pops=0, relaxations=0, search_time=0, path_time=0):
+        "Adds the counters of a finished search and calls the hooks."
+        counters = {'settled': settled, 'pushes': pushes, 'pops': pops, 'relaxations': relaxations,
+                    'cost_calls': self._calls, 'search_time': search_time, 'path_time': path_time}
+        self._calls = 0
+        self.searches += 1
+        for counter, value in counters.items():
+            setattr(self, counter, getattr(self, counter) + value)
+        self.last = dict(counters, engine=engine)
+        for hook in self._hooks:
+            hook(engine, 'search', counters)
+
+    def _record_path(self, engine, path_time):
+        "Adds the time of building a path after the search, e.g. by ShortestPathTree.path."
+        self.path_time += path_time
+        self.last['path_time'] = self.last.get('path_time', 0) + path_time
+        for hook in self._hooks:
+            hook(engine, 'path', {'path_time': path_time})
+
+
+class ShortestPathTree(Mapping):
+    """
+    The result of a shortest path search from one source.
+    Only the costs and the predecessors are stored, paths are built when they are asked for.
+    It behaves like the dictionary {target: path} returned by earlier versions of dijkstra,
+    where the targets are all settled vertices except the source.
+    Internal representation:
+        dist: {vertex: cost from the source}
+        prev: {vertex: previous vertex on the shortest path}
+    """
+    def __init__(self, source, dist, prev, settled, stats=None):
+        self.source = source
+        self.dist = dist
+        self.prev = prev
+        self._settled = settled
+        self._stats = stats
+
+    def __getitem__(self, t):
+        "Gives the path from the source to t."
+        if t == self.source or t not in self._settled:
+            raise KeyError(t)
+        return self.path(t)
+
+    def __contains__(self, t):
+        return t != self.source and t in self._settled
+
+    def __iter__(self):
+        "Iterates over all reachable targets."
+        for vtx in self._settled:
+            if vtx != self.source:
+                yield vtx
+
+    def __len__(self):
+        return len(self._settled) - (self.source in self._settled)
+
+    def path(self, t):
+        "Returns the list of vertices from the source to t, or None if t is not reachable."
+        if t not in self._settled:
+            return None
+        start = perf_counter()
+        path = [t]
+        # the sources have no previous vertex
+        while t in self.prev:
+            t = self.prev[t]
+            path.append(t)
+        path.reverse()
+        if self._stats is not None:
+            self._stats._record_path('dijkstra', perf_counter() - start)
+        return path
+
+    def cost(self, t):
+        "Returns the cost of the shortest path from the source to t, infinity if t is not reachable."
+        if t not in self._settled:
+            return float('inf')
+        return self.dist[t]
+
+
+def unit_cost(u, v):
+    "The cost 1 of every edge, a module level function so that it can be sent to worker processes."
+    return 1
+
+
+def _unset_attribute(attr, a, b):
+    "The error of a search reading an edge whose weight (or other attribute) has not been set."
+    name = attr if isinstance(attr, str) else 'weight'
+    return ValueError("The {} between {} and {} has not been set".format(name, a, b))
+
+
+def _arcs(graph, cost, weight):
+    """Returns a function arcs(u, skip) giving the (neighbour, cost) pairs of u for the neighbours not in skip,
+    shared by the search functions. The cost function is not called for the skipped neighbours."""
+    if weight is None:
+        return lambda u, skip: ((v, cost(u, v)) for v in graph.adjacent(u) if v not in skip)
+    if isinstance(weight, str) or isinstance(graph, FrozenGraph):
+        return lambda u, skip: ((v, w) for v, w in graph.weighted_adjacent(u, weight) if v not in skip)
+    raise ValueError("A weight array can only be used on a FrozenGraph")
+
+
+def dijkstra(graph, source, cost=lambda u,v: 1, target=None, max_cost=None, weight=None, stats=None):
     """A function to calculate shortest path from the source to all the other vertices. 
 
     Args:
-        graph (Graph): an input Graph
+        graph (Graph or FrozenGraph): an input Graph, a FrozenGraph is searched on its integer ids
         source (string): starting vertex
         cost (function, optional): the cost function used to calculate the cost between two vertices. Defaults is 1.
+        target (string, optional): stop the search as soon as this vertex is settled. Defaults to None.
+        max_cost (number, optional): do not explore vertices further away than this cost. Defaults to None.
+        weight (string or array, optional): read the costs from the graph instead of calling cost,
+            either the name of an edge attribute (e.g. 'weight') or, for a FrozenGraph,
+            an array of weights aligned with its edges (see FrozenGraph.edge_weights). Defaults to None.
+        stats (SearchStats, optional): counts the work done by the search. Defaults to None.
 
     Returns:
-        dict: a dictionary where the keys are all target vertices reachable from the source, 
+        ShortestPathTree: behaves like a dictionary where the keys are all target vertices reachable from the source,
               and their values are paths from the source to the target
+              (only the settled vertices when target or max_cost is given)
     """
-    dist = {vtx: float('inf') for vtx in graph.vertices()}
-    prev = {vtx: None for vtx in graph.vertices() if vtx != source}
-    dist[source] = 0
-    visted_vtx = list()
-    pq = PriorityQueue()
-    pq.put((dist[source], source))
+    start = perf_counter()
+    if target is not None and source in graph and not graph.same_component(source, target):
+        # the target can not be reached, nothing needs to be searched
+        if stats is not None:
+            stats._record('dijkstra', search_time=perf_counter()-start)
+        return ShortestPathTree(source, {source: 0}, dict(), {source}, stats)
+    if stats is not None and weight is None:
+        cost = stats._count_calls(cost)
+    if isinstance(graph, FrozenGraph) and source in graph:
+        return _dijkstra_csr(graph, [source], cost, None if target is None else [target], max_cost, weight, stats, start)
+    arcs = _arcs(graph, cost, weight)
+    dist = {source: 0}
+    prev = dict()
+    settled = set()
+    if source not in graph:
+        return ShortestPathTree(source, dist, prev, settled)
+    # heap entries are (cost, counter, vertex), the counter breaks ties without comparing vertices;
+    # outdated entries are not removed but skipped when popped (lazy deletion)
+    counter = 0
+    relaxations = 0
+    pq = [(0, counter, source)]
     # main loop
-    while not pq.empty():
-        _, cur_vtx = pq.get()
-        visted_vtx.append(cur_vtx)
-        
-        for neighbor in graph.neighbours(cur_vtx):
-            weight = cost(cur_vtx, neighbor)
-            if neighbor not in visted_vtx:
-                old_cost = dist[neighbor]
-                new_cost = dist[cur_vtx] + weight
-                if new_cost < old_cost:
-                    pq.put((new_cost, neighbor))
+    while pq:
+        cur_cost, _, cur_vtx = heappop(pq)
+        if cur_vtx in settled:
+            continue
+        settled.add(cur_vtx)
+        if cur_vtx == target:
+            break
+        for neighbor, w in arcs(cur_vtx, settled):
+            relaxations += 1
+            new_cost = cur_cost + w
+            if max_cost is not None and new_cost > max_cost:
+                continue
+            if neighbor not in dist or new_cost < dist[neighbor]:
+                dist[neighbor] = new_cost
+                prev[neighbor] = cur_vtx
+                counter += 1
+                heappush(pq, (new_cost, counter, neighbor))
+    if stats is not None:
+        stats._record('dijkstra', settled=len(settled), pushes=counter+1, pops=counter+1-len(pq),
+                      relaxations=relaxations, search_time=perf_counter()-start)
+    return ShortestPathTree(source, dist, prev, settled, stats)
+
+
+def _dijkstra_csr(graph, sources, cost, goals, max_cost, weight, stats, start):
+    """The same search as dijkstra, but on the integer ids and arrays of a FrozenGraph,
+    from all the sources at once and until one of the goals (if given) is settled."""
+    names, offsets, targets = graph._names, graph._offsets, graph._targets
+    weights = None if weight is None else graph._weight_array(weight)
+    goal_ids = set() if goals is None else {graph._ids[v] for v in goals if v in graph._ids}
+    dist = dict()
+    prev = dict()
+    settled = list()
+    done = bytearray(len(names))
+    counter = -1
+    relaxations = 0
+    pq = list()
+    for source in sources:
+        counter += 1
+        dist[graph._ids[source]] = 0
+        pq.append((0, counter, graph._ids[source]))
+    while pq:
+        cur_cost, _, cur = heappop(pq)
+        if done[cur]:
+            continue
+        done[cur] = 1
+        settled.append(cur)
+        if cur in goal_ids:
+            break
+        cur_name = names[cur]
+        for j in range(offsets[cur], offsets[cur+1]):
+            nb = targets[j]
+            if done[nb]:
+                continue
+            relaxations += 1
+            if weights is None:
+                new_cost = cur_cost + cost(cur_name, names[nb])
+            else:
+                w = weights[j]
+                if w != w:
+                    raise _unset_attribute(weight, cur_name, names[nb])
+                new_cost = cur_cost + w
+            if max_cost is not None and new_cost > max_cost:
+                continue
+            if nb not in dist or new_cost < dist[nb]:
+                dist[nb] = new_cost
+                prev[nb] = cur
+                counter += 1
+                heappush(pq, (new_cost, counter, nb))
+    if stats is not None:
+        stats._record('dijkstra', settled=len(settled), pushes=counter+1, pops=counter+1-len(pq),
+                      relaxations=relaxations, search_time=perf_counter()-start)
+    # translate the ids back to vertex names, only for the settled vertices
+    return ShortestPathTree(sources[0] if len(sources) == 1 else tuple(sources),
+                            {names[i]: dist[i] for i in settled},
+                            {names[i]: names[prev[i]] for i in settled if i in prev},
+                            {names[i] for i in settled},
+                            stats)
+
+
+def multi_source_dijkstra(graph, sources, targets, cost=unit_cost, weight=None, stats=None):
+    """The shortest path from any of the sources to the nearest of the targets, as one dijkstra search
+    that starts from all the sources and stops when a target is settled.
+
+    Args:
+        graph (Graph or FrozenGraph): an input Graph, it is frozen before the search
+        sources (list): starting vertices, e.g. the vertices of one stop on all lines
+        targets (list): ending vertices
+        cost (function, optional): the cost function used to calculate the cost between two vertices. Defaults is 1.
+        weight (string or array, optional): read the costs from the graph, as in dijkstra. Defaults to None.
+        stats (SearchStats, optional): counts the work done by the search. Defaults to None.
+
+    Returns:
+        tuple: the path from a source to a target and its cost, (None, inf) if there is no path
+    """
+    start = perf_counter()
+    frozen = graph.freeze()
+    sources = [v for v in sources if v in frozen]
+    targets = [v for v in targets if v in frozen]
+    if not sources or not targets:
+        if stats is not None:
+            stats._record('dijkstra', search_time=perf_counter()-start)
+        return None, float('inf')
+    if stats is not None and weight is None:
+        cost = stats._count_calls(cost)
+    tree = _dijkstra_csr(frozen, sources, cost, targets, None, weight, stats, start)
+    target = min(targets, key=tree.cost)
+    if tree.cost(target) == float('inf'):
+        return None, float('inf')
+    return tree.path(target), tree.cost(target)
+
+
+def astar(graph, source, target, heuristic, cost=lambda u,v: 1, weight=None, stats=None):
+    """A* search for the shortest path from the source to the target.
+
+    Args:
+        graph (Graph or FrozenGraph): an input Graph
+        source (string): starting vertex
+        target (string): ending vertex
+        heuristic (function): heuristic(u, target) estimates the cost from u to the target,
+            it must never overestimate it (see geo_heuristic and time_heuristic)
+        cost (function, optional): the cost function used to calculate the cost between two vertices. Defaults is 1.
+        weight (string or array, optional): read the costs from the graph, as in dijkstra. Defaults to None.
+        stats (SearchStats, optional): counts the work done by the search. Defaults to None.
+
+    Returns:
+        tuple: the path from the source to the target and its cost, (None, inf) if there is no path
+    """
+    # also when the target can not be reached, nothing needs to be searched
+    start = perf_counter()
+    if not graph.same_component(source, target):
+        if stats is not None:
+            stats._record('astar', search_time=perf_counter()-start)
+        return None, float('inf')
+    if stats is not None and weight is None:
+        cost = stats._count_calls(cost)
+    arcs = _arcs(graph, cost, weight)
+    dist = {source: 0}
+    prev = dict()
+    settled = set()
+    estimate = {source: heuristic(source, target)}
+    counter = 0
+    relaxations = 0
+    pq = [(estimate[source], counter, source)]
+    path = None
+    while pq:
+        _, _, cur_vtx = heappop(pq)
+        if cur_vtx in settled:
+            continue
+        settled.add(cur_vtx)
+        if cur_vtx == target:
+            search_time = perf_counter() - start
+            path = ShortestPathTree(source, dist, prev, settled).path(target)
+            break
+        cur_cost = dist[cur_vtx]
+        for neighbor, w in arcs(cur_vtx, settled):
+            relaxations += 1
+            new_cost = cur_cost + w
+            if neighbor not in dist or new_cost < dist[neighbor]:
+                dist[neighbor] = new_cost
+                prev[neighbor] = cur_vtx
+                if neighbor not in estimate:
+                    estimate[neighbor] = heuristic(neighbor, target)
+                counter += 1
+                heappush(pq, (new_cost + estimate[neighbor], counter, neighbor))
+    if path is None:
+        search_time = perf_counter() - start
+    if stats is not None:
+        stats._record('astar', settled=len(settled), pushes=counter+1, pops=counter+1-len(pq),
+                      relaxations=relaxations, search_time=search_time,
+                      path_time=perf_counter()-start-search_time)
+    if path is None:
+        return None, float('inf')
+    return path, dist[target]
+
+
+def bidirectional_dijkstra(graph, source, target, cost=lambda u,v: 1, weight=None, stats=None):
+    """Shortest path from the source to the target, searching from both ends at the same time.
+    The graph is undirected, so the backward search uses the same edges as the forward one.
+
+    Args:
+        graph (Graph or FrozenGraph): an input Graph
+        source (string): starting vertex
+        target (string): ending vertex
+        cost (function, optional): the cost function used to calculate the cost between two vertices. Defaults is 1.
+        weight (string or array, optional): read the costs from the graph, as in dijkstra. Defaults to None.
+        stats (SearchStats, optional): counts the work done by the search. Defaults to None.
+
+    Returns:
+        tuple: the path from the source to the target and its cost, (None, inf) if there is no path
+    """
+    if graph.is_directed():
+        raise ValueError("bidirectional_dijkstra is only for undirected graphs")
+    start = perf_counter()
+    if not graph.same_component(source, target):
+        if stats is not None:
+            stats._record('bidirectional_dijkstra', search_time=perf_counter()-start)
+        return None, float('inf')
+    if source == target:
+        return [source], 0
+    if stats is not None and weight is None:
+        cost = stats._count_calls(cost)
+    arcs = _arcs(graph, cost, weight)
+    # index 0 is the search from the source, index 1 the search from the target
+    dist = ({source: 0}, {target: 0})
+    prev = (dict(), dict())
+    settled = (set(), set())
+    pq = ([(0, 0, source)], [(0, 0, target)])
+    counter = 0
+    relaxations = 0
+    # best is the cost of the best path found so far, through the vertex meet
+    best, meet = float('inf'), None
+    while pq[0] and pq[1]:
+        # no path through the unsettled vertices can be shorter than best
+        if pq[0][0][0] + pq[1][0][0] >= best:
+            break
+        side = 0 if pq[0][0][0] <= pq[1][0][0] else 1
+        other = 1 - side
+        cur_cost, _, cur_vtx = heappop(pq[side])
+        if cur_vtx in settled[side]:
+            continue
+        settled[side].add(cur_vtx)
+        for neighbor, w in arcs(cur_vtx, settled[side]):
+            relaxations += 1
+            new_cost = cur_cost + w
+            if neighbor not in dist[side] or new_cost < dist[side][neighbor]:
+                dist[side][neighbor] = new_cost
+                prev[side][neighbor] = cur_vtx
+                counter += 1
+                heappush(pq[side], (new_cost, counter, neighbor))
+            if neighbor in dist[other] and dist[side][neighbor] + dist[other][neighbor] < best:
+                best = dist[side][neighbor] + dist[other][neighbor]
+                meet = neighbor
+    search_time = perf_counter() - start
+    path = None
+    if meet is not None:
+        path = [meet]
+        while path[-1] != source:
+            path.append(prev[0][path[-1]])
+        path.reverse()
+        while path[-1] != target:
+            path.append(prev[1][path[-1]])
+    if stats is not None:
+        stats._record('bidirectional_dijkstra', settled=len(settled[0])+len(settled[1]), pushes=counter+2,
+                      pops=counter+2-len(pq[0])-len(pq[1]), relaxations=relaxations,
+                      search_time=search_time, path_time=perf_counter()-start-search_time)
+    return path, best
+
+
+def k_shortest_paths(graph, source, target, k, cost=lambda u,v: 1, weight=None, stats=None):
+    """The k shortest loopless paths from the source to the target (Yen's algorithm).
+    Each next path leaves one of the paths found so far at a spur vertex; the spur searches run
+    on the arrays of the frozen graph with the root vertices and the used edges left out,
+    the graph itself is never copied or changed.
+
+    Args:
+        graph (Graph or FrozenGraph): an input Graph
+        source (string): starting vertex
+        target (string): ending vertex
+        k (int): the number of paths
+        cost (function, optional): the cost function used to calculate the cost between two vertices. Defaults is 1.
+        weight (string or array, optional): read the costs from the graph, as in dijkstra. Defaults to None.
+        stats (SearchStats, optional): counts the work done by all the searches together. Defaults to None.
+
+    Returns:
+        list: up to k pairs (path, cost), sorted by cost
+    """
+    start = perf_counter()
+    if not graph.same_component(source, target) or k < 1:
+        if stats is not None:
+            stats._record('k_shortest_paths', search_time=perf_counter()-start)
+        return []
+    if stats is not None and weight is None:
+        cost = stats._count_calls(cost)
+    frozen = graph.freeze()
+    weights = frozen.edge_weights(cost) if weight is None else frozen._weight_array(weight)
+    names, offsets, targets = frozen._names, frozen._offsets, frozen._targets
+    src, tgt = frozen._ids[source], frozen._ids[target]
+    # settled, pushes, pops, relaxations of all the searches
+    counts = [0, 0, 0, 0]
+    if frozen.is_directed():
+        to_target = [0] * len(names)
+        first, first_cost = _spur_search(frozen, weights, src, tgt, set(), set(), to_target, counts)
+    else:
+        # the costs to the target in the whole graph never overestimate them once vertices and edges
+        # are left out, so the tree from the target is the A* heuristic of every spur search,
+        # and it already holds the first path
+        tree = dijkstra(frozen, target, weight=weights)
+        to_target = [tree.cost(v) for v in names]
+        first = tree.path(source)
+        first_cost = to_target[src]
+        if first is not None:
+            first = [frozen._ids[v] for v in reversed(first)]
+    paths = list()
+    if first is not None:
+        paths.append((first_cost, first))
+    # candidates are (cost, counter, path), seen avoids pushing the same path twice
+    candidates = list()
+    seen = {tuple(first)} if first is not None else set()
+    counter = 0
+    while paths and len(paths) < k:
+        _, last = paths[-1]
+        root_cost = 0
+        for i in range(len(last) - 1):
+            spur = last[i]
+            root = last[:i+1]
+            # leave out the next edges of the found paths with the same root, and the root itself
+            banned = set()
+            for _, path in paths:
+                if path[:i+1] == root:
+                    banned.add(_edge_slot(frozen, path[i], path[i+1]))
+            spur_path, spur_cost = _spur_search(frozen, weights, spur, tgt, set(root[:-1]), banned, to_target, counts)
+            if spur_path is not None:
+                path = root[:-1] + spur_path
+                if tuple(path) not in seen:
+                    seen.add(tuple(path))
+                    counter += 1
+                    heappush(candidates, (root_cost + spur_cost, counter, path))
+            root_cost += weights[_edge_slot(frozen, last[i], last[i+1])]
+        if not candidates:
+            break
+        path_cost, _, path = heappop(candidates)
+        paths.append((path_cost, path))
+    search_time = perf_counter() - start
+    result = [([names[i] for i in path], path_cost) for path_cost, path in paths]
+    if stats is not None:
+        stats._record('k_shortest_paths', settled=counts[0], pushes=counts[1], pops=counts[2],
+                      relaxations=counts[3], search_time=search_time, path_time=perf_counter()-start-search_time)
+    return result
+
+
+def _edge_slot(frozen, a, b):
+    "The index of the edge a -> b in the arrays of a FrozenGraph, given the ids a and b."
+    for j in range(frozen._offsets[a], frozen._offsets[a+1]):
+        if frozen._targets[j] == b:
+            return j
+    raise KeyError((a, b))
+
+
+def _spur_search(frozen, weights, source, target, blocked, banned, to_target, counts):
+    """A* on the ids of a FrozenGraph without the blocked vertices and the banned edge slots,
+    to_target is the heuristic. Returns the path of ids and its cost, (None, inf) if there is no path."""
+    if to_target[source] == float('inf'):
+        return None, float('inf')
+    offsets, targets = frozen._offsets, frozen._targets
+    dist = {source: 0}
+    prev = dict()
+    done = set(blocked)
+    counter = 0
+    pq = [(to_target[source], counter, source)]
+    path = None
+    while pq:
+        _, _, cur = heappop(pq)
+        counts[2] += 1
+        if cur in done:
+            continue
+        done.add(cur)
+        counts[0] += 1
+        if cur == target:
+            path = [cur]
+            while path[-1] != source:
+                path.append(prev[path[-1]])
+            path.reverse()
+            break
+        for j in range(offsets[cur], offsets[cur+1]):
+            nb = targets[j]
+            if nb in done or j in banned:
+                continue
+            counts[3] += 1
+            w = weights[j]
+            if w != w:
+                raise _unset_attribute(weights, frozen._names[cur], frozen._names[nb])
+            new_cost = dist[cur] + w
+            if (nb not in dist or new_cost < dist[nb]) and to_target[nb] != float('inf'):
+                dist[nb] = new_cost
+                prev[nb] = cur
+                counter += 1
+                heappush(pq, (new_cost + to_target[nb], counter, nb))
+    counts[1] += counter + 1
+    if path is None:
+        return None, float('inf')
+    return path, dist[target]
+
+
+class ContractionHierarchy:
+    """
+    A contraction hierarchy of an undirected graph, for fast point-to-point shortest path queries.
+    The vertices are contracted one by one, the least important first, and shortcut edges are
+    added between the remaining neighbours so that their shortest paths are kept.
+    A query only follows edges towards more important vertices, from both ends.
+    Internal representation:
+        _rank: {vertex: position in the contraction order}
+        _up: {vertex: {more important neighbour: (cost, via)}},
+             where via is the contracted vertex of a shortcut and None for an original edge
+    """
+    def __init__(self, graph=None, cost=lambda u,v: 1, weight=None, witness_limit=50):
+        """Builds the hierarchy of graph (if given), the costs are given as in dijkstra.
+        witness_limit bounds the number of vertices settled when looking for a path that makes
+        a shortcut unnecessary, a smaller limit builds faster but may add more shortcuts."""
+        self._rank = dict()
+        self._up = dict()
+        if graph is not None:
+            self._build(graph, cost, weight, witness_limit)
+
+    def __len__(self):
+        "Return the length (number) of vertices."
+        return len(self._rank)
+
+    def __contains__(self, v):
+        "Checks if v is a vertex of the hierarchy."
+        return v in self._rank
+
+    def vertices(self):
+        "Lists all vertices, in contraction order."
+        return sorted(self._rank, key=self._rank.get)
+
+    def _build(self, graph, cost, weight, witness_limit):
+        if graph.is_directed():
+            raise ValueError("A contraction hierarchy is only built for undirected graphs")
+        arcs = _arcs(graph, cost, weight)
+        # the graph of the vertices that are not contracted yet, with shortcuts
+        remaining = {v: dict() for v in graph.vertices()}
+        for a in remaining:
+            for b, w in arcs(a, ()):
+                if b != a and (b not in remaining[a] or w < remaining[a][b][0]):
+                    remaining[a][b] = (w, None)
+        contracted_nbs = dict.fromkeys(remaining, 0)
+
+        def shortcuts(v):
+            "The shortcuts needed if v is contracted now."
+            nbs = list(remaining[v].items())
+            needed = list()
+            for i, (u, (wu, _)) in enumerate(nbs):
+                costs = {x: wu + wx for x, (wx, _) in nbs[i+1:]}
+                if not costs:
+                    continue
+                witness = self._witness(remaining, u, v, max(costs.values()), witness_limit)
+                for x, c in costs.items():
+                    if witness.get(x, float('inf')) > c:
+                        needed.append((u, x, c))
+            return needed
+
+        def priority(v, needed):
+            "Edge difference plus the number of contracted neighbours, the smallest is contracted first."
+            return len(needed) - len(remaining[v]) + contracted_nbs[v]
+
+        pq = list()
+        for counter, v in enumerate(remaining):
+            heappush(pq, (priority(v, shortcuts(v)), counter, v))
+        counter = len(pq)
+        while pq:
+            _, _, v = heappop(pq)
+            # the priorities of the other vertices may be outdated, recompute before contracting
+            needed = shortcuts(v)
+            prio = priority(v, needed)
+            if pq and prio > pq[0][0]:
+                counter += 1
+                heappush(pq, (prio, counter, v))
+                continue
+            self._rank[v] = len(self._rank)
+            self._up[v] = dict(remaining[v])
+            for u, x, c in needed:
+                if x not in remaining[u] or c < remaining[u][x][0]:
+                    remaining[u][x] = (c, v)
+                    remaining[x][u] = (c, v)
+            for u in remaining[v]:
+                del remaining[u][v]
+                contracted_nbs[u] += 1
+            del remaining[v]
+
+    @staticmethod
+    def _witness(remaining, source, skip, max_cost, limit):
+        "Costs found by a small dijkstra from source that avoids skip, used to decide on shortcuts."
+        dist = {source: 0}
+        settled = set()
+        pq = [(0, 0, source)]
+        counter = 0
+        while pq and len(settled) < limit:
+            cur_cost, _, cur_vtx = heappop(pq)
+            if cur_vtx in settled:
+                continue
+            settled.add(cur_vtx)
+            for neighbor, (w, _) in remaining[cur_vtx].items():
+                new_cost = cur_cost + w
+                if neighbor == skip or new_cost > max_cost:
+                    continue
+                if neighbor not in dist or new_cost < dist[neighbor]:
                     dist[neighbor] = new_cost
-                    prev[neighbor] = cur_vtx
-    # build the output dictionary
-    shortest_path = dict()
-    for vtx in graph.vertices():
-        if vtx != source:
-            possible = True
-            t = vtx
-            path = list()
-            while t != source:
-                if t in prev:
-                    path.append(t)
-                    t = prev[t]
-                else:
-                    possible = False
-                    break
-            if possible:
-                path.append(source)
-                path.reverse()
-                shortest_path[vtx] = path
-    return shortest_path
+                    counter += 1
+                    heappush(pq, (new_cost, counter, neighbor))
+        return dist
+
+    def query(self, source, target, stats=None):
+        """Shortest path from the source to the target, stats (SearchStats) counts the work done if given.
+
+        Returns:
+            tuple: the path from the source to the target and its cost, (None, inf) if there is no path
+        """
+        if source not in self._rank or target not in self._rank:
+            return None, float('inf')
+        if source == target:
+            return [source], 0
+        start = perf_counter()
+        # index 0 is the upward search from the source, index 1 the upward search from the target
+        dist = ({source: 0}, {target: 0})
+        prev = (dict(), dict())
+        settled = (set(), set())
+        pq = ([(0, 0, source)], [(0, 0, target)])
+        counter = 0
+        relaxations = 0
+        best, meet = float('inf'), None
+        while True:
+            # a search stops when its smallest cost is not below the best path found
+            active = [side for side in (0, 1) if pq[side] and pq[side][0][0] < best]
+            if not active:
+                break
+            side = min(active, key=lambda side: pq[side][0][0])
+            cur_cost, _, cur_vtx = heappop(pq[side])
+            if cur_vtx in settled[side]:
+                continue
+            settled[side].add(cur_vtx)
+            if cur_vtx in dist[1-side] and cur_cost + dist[1-side][cur_vtx] < best:
+                best = cur_cost + dist[1-side][cur_vtx]
+                meet = cur_vtx
+            for neighbor, (w, _) in self._up[cur_vtx].items():
+                relaxations += 1
+                new_cost = cur_cost + w
+                if neighbor not in dist[side] or new_cost < dist[side][neighbor]:
+                    dist[side][neighbor] = new_cost
+                    prev[side][neighbor] = cur_vtx
+                    counter += 1
+                    heappush(pq[side], (new_cost, counter, neighbor))
+        search_time = perf_counter() - start
+        if meet is None:
+            path = None
+        else:
+            path = self._path(source, target, meet, prev)
+        if stats is not None:
+            stats._record('contraction_hierarchy', settled=len(settled[0])+len(settled[1]), pushes=counter+2,
+                          pops=counter+2-len(pq[0])-len(pq[1]), relaxations=relaxations,
+                          search_time=search_time, path_time=perf_counter()-start-search_time)
+        return path, best
+
+    def _path(self, source, target, meet, prev):
+        "The path found by a query, with the shortcuts unpacked."
+        up_path = [meet]
+        while up_path[-1] != source:
+            up_path.append(prev[0][up_path[-1]])
+        up_path.reverse()
+        while up_path[-1] != target:
+            up_path.append(prev[1][up_path[-1]])
+        # replace the shortcuts by the original edges
+        path = [source]
+        for a, b in zip(up_path, up_path[1:]):
+            path.extend(self._unpack(a, b)[1:])
+        return path
+
+    def _unpack(self, a, b):
+        "The original path of the edge a - b."
+        low, high = (a, b) if self._rank[a] < self._rank[b] else (b, a)
+        via = self._up[low][high][1]
+        if via is None:
+            return [a, b]
+        return self._unpack(a, via)[:-1] + self._unpack(via, b)
+
+    def save(self, filename):
+        "Saves the hierarchy in a json file, vertices are stored in contraction order and edges by position."
+        order = self.vertices()
+        index = {v: i for i, v in enumerate(order)}
+        edges = [[index[v], index[u], w, -1 if via is None else index[via]]
+                 for v in order for u, (w, via) in self._up[v].items()]
+        with open(filename, 'w', encoding='utf-8') as jfile:
+            json.dump({'order': order, 'edges': edges}, jfile)
+
+    @classmethod
+    def load(cls, filename):
+        "Reads a hierarchy saved by save."
+        with open(filename, 'r', encoding='utf-8') as jfile:
+            data = json.load(jfile)
+        hierarchy = cls()
+        order = data['order']
+        for i, v in enumerate(order):
+            hierarchy._rank[v] = i
+            hierarchy._up[v] = dict()
+        for a, b, w, via in data['edges']:
+            hierarchy._up[order[a]][order[b]] = (w, None if via < 0 else order[via])
+        return hierarchy
+
+
+class AllPairsPaths:
+    """
+    Shortest path costs and next hops between all pairs of vertices of an undirected graph,
+    so that costs and paths are looked up instead of searched.
+    Internal representation:
+        _names: [vertex with index 0, vertex with index 1, ...]
+        _ids: {vertex: index}
+        _costs: array of n*n costs, _costs[i*n + j] is the cost from i to j (inf if not reachable)
+        _next: array of n*n indices, _next[i*n + j] is the vertex after i on the path from i to j (-1 if none)
+    """
+    def __init__(self, graph=None, cost=lambda u,v: 1, weight=None):
+        "Computes the tables by one dijkstra per vertex (if a graph is given), the costs are given as in dijkstra."
+        self._names = list()
+        self._ids = dict()
+        self._costs = array('d')
+        self._next = array('i')
+        if graph is not None:
+            if graph.is_directed():
+                raise ValueError("The all-pairs tables are only built for undirected graphs")
+            self._build(graph.freeze(), cost, weight)
+
+    def __len__(self):
+        "Return the length (number) of vertices."
+        return len(self._names)
+
+    def __contains__(self, v):
+        "Checks if v is a vertex of the tables."
+        return v in self._ids
+
+    def vertices(self):
+        "Lists all vertices."
+        return list(self._names)
+
+    def _build(self, frozen, cost, weight):
+        self._names = frozen.vertices()
+        self._ids = {v: i for i, v in enumerate(self._names)}
+        n = len(self._names)
+        self._costs = array('d', [float('inf')]) * (n*n)
+        self._next = array('i', [-1]) * (n*n)
+        for j, t in enumerate(self._names):
+            # the graph is undirected, so the tree from t gives the costs to t
+            # and the previous vertex towards t is the next hop from any vertex to t
+            tree = dijkstra(frozen, t, cost, weight=weight)
+            self._costs[j*n + j] = 0
+            for s in tree:
+                i = self._ids[s]
+                self._costs[i*n + j] = tree.cost(s)
+                self._next[i*n + j] = self._ids[tree.prev[s]]
+
+    def cost(self, a, b):
+        "Returns the cost of the shortest path from a to b, infinity if b is not reachable."
+        if a not in self._ids or b not in self._ids:
+            return float('inf')
+        return self._costs[self._ids[a]*len(self._names) + self._ids[b]]
+
+    def path(self, a, b):
+        "Returns the shortest path from a to b rebuilt from the next hops, None if b is not reachable."
+        if self.cost(a, b) == float('inf'):
+            return None
+        n = len(self._names)
+        i, j = self._ids[a], self._ids[b]
+        path = [a]
+        while i != j:
+            i = self._next[i*n + j]
+            path.append(self._names[i])
+        return path
+
+    def save(self, filename):
+        "Saves the tables in a binary file: a json header line with the vertices, then the raw arrays."
+        header = {'vertices': self._names, 'byteorder': sys.byteorder,
+                  'typecodes': [self._costs.typecode, self._next.typecode]}
+        with open(filename, 'wb') as bfile:
+            bfile.write(json.dumps(header).encode('utf-8') + b'\n')
+            self._costs.tofile(bfile)
+            self._next.tofile(bfile)
+
+    @classmethod
+    def load(cls, filename):
+        "Reads tables saved by save."
+        paths = cls()
+        with open(filename, 'rb') as bfile:
+            header = json.loads(bfile.readline().decode('utf-8'))
+            paths._names = header['vertices']
+            paths._ids = {v: i for i, v in enumerate(paths._names)}
+            n = len(paths._names)
+            paths._costs = array(header['typecodes'][0])
+            paths._costs.fromfile(bfile, n*n)
+            paths._next = array(header['typecodes'][1])
+            paths._next.fromfile(bfile, n*n)
+        if header['byteorder'] != sys.byteorder:
+            paths._costs.byteswap()
+            paths._next.byteswap()
+        return paths
+
+
+def shortest_path_matrix(graph, sources, targets=None, cost=unit_cost, weight=None, workers=None, stats=None,
+                         mp_context=None):
+    """Shortest path costs from many sources to many targets, one dijkstra per source.
+
+    Args:
+        graph (Graph or FrozenGraph): an input Graph, it is frozen once before the searches
+        sources (list): starting vertices
+        targets (list, optional): ending vertices. Defaults to all vertices.
+        cost (function, optional): the cost function used to calculate the cost between two vertices. Defaults is 1.
+        weight (string or array, optional): read the costs from the graph, as in dijkstra. Defaults to None.
+        workers (int, optional): spread the sources over this many processes, the frozen graph
+            is sent once to each of them; cost must then be a module level function, unless weight is given. Defaults to None.
+        stats (SearchStats, optional): counts the work done by the searches, not used with workers. Defaults to None.
+        mp_context (multiprocessing context, optional): how the worker processes are started, e.g.
+            multiprocessing.get_context('spawn'). Defaults to the start method of the platform.
+
+    Returns:
+        numpy.ndarray: matrix[i, j] is the cost from sources[i] to targets[j], inf if not reachable
+    """
+    frozen = graph.freeze()
+    if targets is None:
+        targets = frozen.vertices()
+    matrix = np.full((len(sources), len(targets)), np.inf)
+    if workers:
+        # the costs are read from the graph when weight is given, and the cost function is not sent
+        with ProcessPoolExecutor(max_workers=workers, mp_context=mp_context, initializer=_init_matrix_worker,
+                                 initargs=(frozen, targets, None if weight is not None else cost, weight)) as executor:
+            rows = executor.map(_matrix_row, sources, chunksize=max(1, len(sources) // (4*workers)))
+            for i, row in enumerate(rows):
+                matrix[i] = row
+    else:
+        for i, source in enumerate(sources):
+            matrix[i] = _matrix_row(source, frozen, targets, cost, weight, stats)
+    return matrix
+
+
+# the arguments of shortest_path_matrix, kept by each worker process
+_matrix_args = None
+
+
+def _init_matrix_worker(frozen, targets, cost, weight):
+    global _matrix_args
+    _matrix_args = (frozen, targets, cost, weight)
+
+
+def _matrix_row(source, frozen=None, targets=None, cost=None, weight=None, stats=None):
+    "The costs from one source to all targets, in a worker process the graph comes from _init_matrix_worker."
+    if frozen is None:
+        frozen, targets, cost, weight = _matrix_args
+    tree = dijkstra(frozen, source, cost, weight=weight, stats=stats)
+    return [tree.cost(t) for t in targets]
+
+
+EARTH_RADIUS = 6371.009
+
+
+def haversine_distance(p1, p2):
+    "The great-circle distance (km) between two (lat, lon) positions given in degrees."
+    lat1, lon1 = math.radians(p1[0]), math.radians(p1[1])
+    lat2, lon2 = math.radians(p2[0]), math.radians(p2[1])
+    h = math.sin((lat2-lat1)/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2-lon1)/2)**2
+    return 2 * EARTH_RADIUS * math.asin(min(1, math.sqrt(h)))
+
+
+def equirectangular_distance(p1, p2):
+    "The equirectangular approximation of the distance (km) between two (lat, lon) positions, as used for the trams."
+    lat1, lon1 = math.radians(p1[0]), math.radians(p1[1])
+    lat2, lon2 = math.radians(p2[0]), math.radians(p2[1])
+    lat_m = (lat1 + lat2)/2
+    return EARTH_RADIUS * math.sqrt((lat2-lat1)**2 + (math.cos(lat_m) * (lon2-lon1))**2)
+
+
+def equirectangular_distance_many(lat1, lon1, lat2, lon2):
+    "The equirectangular distances (km) between NumPy arrays of latitudes and longitudes given in radians, elementwise."
+    lat_m = (lat1 + lat2)/2
+    return EARTH_RADIUS * np.sqrt((lat2-lat1)**2 + (np.cos(lat_m) * (lon2-lon1))**2)
+
+
+def geo_heuristic(position, distance=haversine_distance):
+    """A* heuristic for geographic costs: the straight distance to the target.
+
+    Args:
+        position (function): position(v) gives the (lat, lon) of a vertex
+        distance (function, optional): distance between two positions, use the same formula as the costs.
+            Defaults to haversine_distance.
+
+    Returns:
+        function: heuristic(u, target)
+    """
+    return lambda u, t: distance(position(u), position(t))
+
+
+def time_heuristic(position, speed, distance=haversine_distance):
+    """A* heuristic for travel time costs: the straight distance to the target at the maximal speed.
+
+    Args:
+        position (function): position(v) gives the (lat, lon) of a vertex
+        speed (number): the maximal speed (distance per time unit) on any edge, see max_speed
+        distance (function, optional): distance between two positions. Defaults to haversine_distance.
+
+    Returns:
+        function: heuristic(u, target)
+    """
+    return lambda u, t: distance(position(u), position(t)) / speed
+
+
+def max_speed(graph, position, cost=lambda u,v: 1, weight=None, distance=haversine_distance):
+    "The maximal observed speed, straight distance divided by cost, over all edges of the graph (edges with cost 0 are skipped)."
+    arcs = _arcs(graph, cost, weight)
+    speed = 0
+    for a in graph.vertices():
+        for b, w in arcs(a, ()):
+            if w > 0:
+                speed = max(speed, distance(position(a), position(b)) / w)
+    return speed
+
+
+def bfs(graph, source, stats=None):
+    """Breadth-first search from the source.
+
+    Args:
+        graph (Graph or FrozenGraph): an input graph
+        source (string): starting vertex
+        stats (SearchStats, optional): counts the work done by the search. Defaults to None.
+
+    Returns:
+        dict: the vertices reachable from the source in the order they are found,
+              with the number of edges from the source as values
+    """
+    if source not in graph:
+        return dict()
+    start = perf_counter()
+    relaxations = 0
+    if isinstance(graph, FrozenGraph):
+        names, offsets, targets = graph._names, graph._offsets, graph._targets
+        hops = {graph._ids[source]: 0}
+        queue = deque([graph._ids[source]])
+        while queue:
+            cur = queue.popleft()
+            relaxations += offsets[cur+1] - offsets[cur]
+            for j in range(offsets[cur], offsets[cur+1]):
+                nb = targets[j]
+                if nb not in hops:
+                    hops[nb] = hops[cur] + 1
+                    queue.append(nb)
+        hops = {names[i]: h for i, h in hops.items()}
+    else:
+        hops = {source: 0}
+        queue = deque([source])
+        while queue:
+            cur = queue.popleft()
+            for nb in graph.adjacent(cur):
+                relaxations += 1
+                if nb not in hops:
+                    hops[nb] = hops[cur] + 1
+                    queue.append(nb)
+    if stats is not None:
+        stats._record('bfs', settled=len(hops), pushes=len(hops), pops=len(hops),
+                      relaxations=relaxations, search_time=perf_counter()-start)
+    return hops
+
+
+def normalize_name(name):
+    """The form of a name used for looking it up: case folded, without diacritics, and with single spaces.
+
+    Args:
+        name (string): e.g. 'Östra  Sjukhuset'
+
+    Returns:
+        string: e.g. 'ostra sjukhuset'
+    """
+    decomposed = unicodedata.normalize('NFKD', name.casefold())
+    return ' '.join(''.join(c for c in decomposed if not unicodedata.combining(c)).split())
+
+
+def bounded_edit_distance(a, b, bound):
+    """The edit distance (insertions, deletions and substitutions) between two strings, if it is at most bound.
+    Only the diagonal band of width 2*bound+1 is computed, and the computation stops when a row exceeds bound.
+
+    Args:
+        a (string): the first string
+        b (string): the second string
+        bound (int): the largest distance of interest
+
+    Returns:
+        int: the edit distance, or None if it is larger than bound
+    """
+    if len(a) > len(b):
+        a, b = b, a
+    if len(b) - len(a) > bound:
+        return None
+    over = bound + 1
+    prev = [j if j <= bound else over for j in range(len(b)+1)]
+    for i in range(1, len(a)+1):
+        cur = [over] * (len(b)+1)
+        if i <= bound:
+            cur[0] = i
+        row_min = cur[0]
+        char = a[i-1]
+        for j in range(max(1, i-bound), min(len(b), i+bound) + 1):
+            d = prev[j-1] + (char != b[j-1])
+            if prev[j] + 1 < d:
+                d = prev[j] + 1
+            if cur[j-1] + 1 < d:
+                d = cur[j-1] + 1
+            if d < row_min:
+                row_min = d
+            cur[j] = d if d < over else over
+        if row_min > bound:
+            return None
+        prev = cur
+    return prev[-1] if prev[-1] <= bound else None
+
+
+class NameIndex:
+    """
+    An index of names, e.g. of the stops of a network, for finding them by their normalized form
+    (see normalize_name), by a prefix, or with a few typos.
+    The normalized names are kept sorted in one list, so that the names with a prefix are one slice of it.
+    """
+    def __init__(self, names):
+        entries = sorted((normalize_name(str(name)), name) for name in names)
+        self._keys = [key for key, _ in entries]
+        self._names = [name for _, name in entries]
+        self._exact = set(self._names)
+        # the positions of the keys of each length, for the typo lookups
+        self._lengths = dict()
+        for i, key in enumerate(self._keys):
+            self._lengths.setdefault(len(key), []).append(i)
+
+    def __len__(self):
+        return len(self._names)
+
+    def __contains__(self, name):
+        return name in self._exact
+
+    def find(self, name):
+        "The names that are the same as name when normalized."
+        key = normalize_name(name)
+        i = bisect_left(self._keys, key)
+        return self._names[i:bisect_right(self._keys, key, i)]
+
+    def resolve(self, name):
+        "The name meant by name: itself if it is in the index, or the only name found by find, else None."
+        if name in self._exact:
+            return name
+        found = self.find(name)
+        return found[0] if len(found) == 1 else None
+
+    def prefix(self, prefix):
+        "The names that start with prefix when normalized, in the order of their normalized forms."
+        key = normalize_name(prefix)
+        i = bisect_left(self._keys, key)
+        return self._names[i:bisect_left(self._keys, key + '\U0010ffff', i)]
+
+    def similar(self, name, max_distance=2):
+        "The names within max_distance edits of name when normalized, the closest first."
+        key = normalize_name(name)
+        found = list()
+        for length in range(len(key) - max_distance, len(key) + max_distance + 1):
+            for i in self._lengths.get(length, []):
+                distance = bounded_edit_distance(key, self._keys[i], max_distance)
+                if distance is not None:
+                    found.append((distance, i))
+        return [self._names[i] for _, i in sorted(found)]
@@ -3,7 +3,8 @@ import json
 # imports added in Lab3 version
 import math
 import os
-from .graphs import WeightedGraph
+import numpy as np
+from .graphs import NameIndex, WeightedGraph, ContractionHierarchy, AllPairsPaths, bidirectional_dijkstra, astar, k_shortest_paths, geo_heuristic, equirectangular_distance, equirectangular_distance_many, multi_source_dijkstra
 from django.conf import settings
 
 
@@ -94,13 +95,27 @@ class TramNetwork(WeightedGraph):
               all_stops(): Get all stops, return list
               extreme_positions(): pass
               geo_distance(): Get the distance between two stop, return float
+              geo_distance_many(pairs): Get the distances of many pairs of stops, return numpy array
+              geo_distance_matrix(): Get the distances between all stops, in the order of all_stops(), return numpy array
               line_stop(): Get all the stops of this line, return list
               remove_lines(): Remove one line or some lines from _linedict, _timedict, also call remove_edge function
               stop_lines(): Get all the lines will stop in this stop, return list
               stop_position(): Get the position of this stop, Retrun tuple
               transition_time(a,b): Get the time cost from stop a to stop b
+              set_hierarchy(hierarchy): Use a precomputed contraction hierarchy for quickest_route
+              quickest_route(a,b): Get the quickest route from stop a to stop b and its time, return (list, number)
+              shortest_route(a,b): Get the shortest route from stop a to stop b and its length, return (list, number)
+              set_matrices(time_paths, geo_paths): Use precomputed all-pairs tables for the lookups below
+              shortest_time(a,b): Get the shortest travel time from stop a to stop b
+              shortest_distance(a,b): Get the length of the shortest route from stop a to stop b
+              route(a,b,by): Get the quickest (by='time') or shortest (by='geo') route from stop a to stop b, return list
+              alternative_routes(a,b,k): Get up to k quickest loopless routes from stop a to stop b and their times, return list
+              line_travel_time(line,a,b): Get the time from stop a to stop b along the line, return number
+              find_stop(name): Get the stop named name in any case and with or without diacritics, return str or None
+              stops_with_prefix(prefix): Get the stops whose names start with prefix, return list
+              similar_stops(name,max_distance): Get the stops within max_distance typos of name, the closest first, return list
     ''' 
-    def __init__(self, lines=None, stops=None, times=None):
+    def __init__(self, lines=None, stops=None, times=None, stop_lines=None, line_index=None):
         super().__init__()
 
         self._linedict = dict()
@@ -110,12 +125,11 @@ class TramNetwork(WeightedGraph):
 
         self._stopdict = dict()
         if stops:
+            # the lines via each stop, stored in the json file, or built as for the json file
+            if stop_lines is None:
+                stop_lines = build_stop_lines({line: self._linedict[line].get_stops() for line in self._linedict})
             for stop in stops:
-                _tmp_stop_line = []
-                for line in lines:
-                    if stop in self._linedict[line].get_stops():
-                        _tmp_stop_line.append(line)
-                self._stopdict[str(stop)] = TramStop(stop, lines=_tmp_stop_line, lat=stops[stop]['lat'], lon=stops[stop]['lon'])
+                self._stopdict[str(stop)] = TramStop(stop, lines=list(stop_lines.get(stop, [])), lat=stops[stop]['lat'], lon=stops[stop]['lon'])
 
         self._timedict = dict()
         if times:
@@ -127,6 +141,25 @@ class TramNetwork(WeightedGraph):
             for stop2 in self._timedict[stop1]:
                 self.add_edge(stop1, stop2)
                 self.set_weight(stop1, stop2, self._timedict[stop1][stop2])
+        # the coordinates of the stops in radians, in the order of _stop_ids
+        self._stop_ids = {stop: i for i, stop in enumerate(self._stopdict)}
+        positions = [self._stopdict[stop].get_position() for stop in self._stopdict]
+        self._lat = np.radians(np.array([pos[0] for pos in positions], dtype=float))
+        self._lon = np.radians(np.array([pos[1] for pos in positions], dtype=float))
+        self._geo_matrix = None
+        # the lengths of the edges, for the geographic routes, computed once, when the stops are known
+        if self._stopdict:
+            edges = self.edges()
+            self.set_edge_attributes(edges, 'distance', self.geo_distance_many(edges))
+        # the names of the stops, for finding them without the exact spelling
+        self._stop_index = NameIndex(self._stopdict)
+        # the positions of the stops on each line and the times from the first stop, from the json file or built when first asked
+        self._line_index = dict(line_index) if line_index else dict()
+        # the contraction hierarchy, set by readTramNetwork if it was built together with the json file
+        self._hierarchy = None
+        # the all-pairs tables, set by readTramNetwork if they were built together with the json file
+        self._time_paths = None
+        self._geo_paths = None
                 
     
     def all_lines(self):
@@ -142,31 +175,35 @@ class TramNetwork(WeightedGraph):
         a = str(a)
         b = str(b)
 
-        if a not in list(self._stopdict.keys()) or b not in list(self._stopdict.keys()):
+        if a not in self._stop_ids or b not in self._stop_ids:
             return "unknown arguments"
         if a == b:
             return("Please enter two different stops!")
         
-        lat1, lon1 = self.stop_position(a)
-        lat2, lon2 = self.stop_position(b)
-        
-        Earth_Radius = 6371.009
-        one_degree = math.pi/180
-        lat1 *= one_degree
-        lon1 *= one_degree
-        lat2 *= one_degree
-        lon2 *= one_degree
+        return self.geo_distance_many([(a, b)]).item(0)
+
+    def geo_distance_many(self, pairs):
+        # the distances of many pairs of stops at once, as geo_distance but 0 for a stop and itself
+        ids = [(self._stop_ids.get(str(a)), self._stop_ids.get(str(b))) for a, b in pairs]
+        if any(i is None or j is None for i, j in ids):
+            return "unknown arguments"
+        i = np.array([a for a, _ in ids], dtype=int)
+        j = np.array([b for _, b in ids], dtype=int)
+        return self._equirectangular(self._lat[i], self._lon[i], self._lat[j], self._lon[j])
 
-        dlon = lon2 - lon1
-        dlat = lat2 - lat1
-        lat_m = (lat1 + lat2)/2
+    def geo_distance_matrix(self):
+        # the distances between all stops, in the order of all_stops(), computed when first asked
+        if self._geo_matrix is None:
+            self._geo_matrix = self._equirectangular(self._lat[:, None], self._lon[:, None],
+                                                     self._lat[None, :], self._lon[None, :])
+        return self._geo_matrix
 
-        distance = Earth_Radius * math.sqrt(dlat**2 + (math.cos(lat_m) * dlon)**2)
-        return round(distance, 3)
+    def _equirectangular(self, lat1, lon1, lat2, lon2):
+        return np.round(equirectangular_distance_many(lat1, lon1, lat2, lon2), 3)
 
     def line_stops(self, line):
         line = str(line)
-        if line in list(self._linedict.keys()):
+        if line in self._linedict:
             return self._linedict[line].get_stops()
         return("The line {} is not exist".format(line))
 
@@ -175,9 +212,17 @@ class TramNetwork(WeightedGraph):
             line = str(line)
             line_stops = self.line_stops(line)
             
+            # the hierarchy and the tables are not valid for the changed network
+            self._hierarchy = None
+            self._time_paths = None
+            self._geo_paths = None
+            # the lines change even when no edge is removed, e.g. for the cached specialized network
+            self._changed()
+
             # update _linedict, remove the whole line
             if line in list(self._linedict.keys()):
                 del self._linedict[line]
+            self._line_index.pop(line, None)
             
             # update _stopdict, remove the line from stop's info
             for stop in line_stops:
@@ -218,10 +263,73 @@ class TramNetwork(WeightedGraph):
             return self._stopdict[a].get_position()
 
     def transition_time(self, a, b):
-        if a in list(self._timedict.keys()):
-            if b in list(self._timedict[a].keys()):
+        if a in self._timedict:
+            if b in self._timedict[a]:
                 return self._timedict[a][b]
             return '{} and {} are not adjacent'.format(a,b)
+
+    def line_travel_time(self, line, a, b):
+        line = str(line)
+        if line not in self._linedict:
+            return("The line {} is not exist".format(line))
+        if line not in self._line_index:
+            self._line_index.update(build_line_index({line: self._linedict[line].get_stops()}, self._timedict))
+        positions, times = self._line_index[line]['positions'], self._line_index[line]['times']
+        if a not in positions or b not in positions:
+            return '{} and {} are not both on line {}'.format(a, b, line)
+        # the shortest ride if the line passes a stop twice
+        return min(abs(times[j] - times[i]) for i in positions[a] for j in positions[b])
+
+    def find_stop(self, name):
+        return self._stop_index.resolve(name)
+
+    def stops_with_prefix(self, prefix):
+        return self._stop_index.prefix(prefix)
+
+    def similar_stops(self, name, max_distance=2):
+        return self._stop_index.similar(name, max_distance)
+
+    def set_hierarchy(self, hierarchy):
+        if hierarchy is not None and set(hierarchy.vertices()) != set(self.vertices()):
+            raise ValueError("The hierarchy was built for another network")
+        self._hierarchy = hierarchy
+
+    def quickest_route(self, a, b):
+        if self._hierarchy is not None:
+            return self._hierarchy.query(a, b)
+        return bidirectional_dijkstra(self, a, b, weight='weight')
+
+    def shortest_route(self, a, b):
+        heuristic = geo_heuristic(self.stop_position, distance=equirectangular_distance)
+        return astar(self, a, b, heuristic, weight='distance')
+
+    def set_matrices(self, time_paths, geo_paths):
+        for paths in [time_paths, geo_paths]:
+            if paths is not None and set(paths.vertices()) != set(self.vertices()):
+                raise ValueError("The tables were built for another network")
+        self._time_paths = time_paths
+        self._geo_paths = geo_paths
+
+    def shortest_time(self, a, b):
+        if self._time_paths is not None:
+            return self._time_paths.cost(a, b)
+        return self.quickest_route(a, b)[1]
+
+    def shortest_distance(self, a, b):
+        if self._geo_paths is not None:
+            return self._geo_paths.cost(a, b)
+        return self.shortest_route(a, b)[1]
+
+    def route(self, a, b, by='time'):
+        paths = {'time': self._time_paths, 'geo': self._geo_paths}[by]
+        if paths is not None:
+            return paths.path(a, b)
+        if by == 'time':
+            return self.quickest_route(a, b)[0]
+        return self.shortest_route(a, b)[0]
+
+    def alternative_routes(self, a, b, k=3):
+        return k_shortest_paths(self, a, b, k, weight='weight')
     
     def extreme_positions(self):
         stops = self._stopdict.values()
@@ -247,24 +355,148 @@ def readTramNetwork(tramfile=TRAM_FILE):
     stops = tramnetwork['stops']
     times = tramnetwork['times']
 
-    tramnetwork =  TramNetwork(lines, stops, times)
+    tramnetwork =  TramNetwork(lines, stops, times, tramnetwork.get('stop_lines'), tramnetwork.get('line_index'))
+
+    # the contraction hierarchy is saved next to the json file by tramdata.build_tram_network
+    hierarchy_file = os.path.splitext(tramfile)[0] + '.ch.json'
+    if os.path.exists(hierarchy_file):
+        tramnetwork.set_hierarchy(ContractionHierarchy.load(hierarchy_file))
+    time_file = os.path.splitext(tramfile)[0] + '.time.bin'
+    geo_file = os.path.splitext(tramfile)[0] + '.geo.bin'
+    if os.path.exists(time_file) and os.path.exists(geo_file):
+        tramnetwork.set_matrices(AllPairsPaths.load(time_file), AllPairsPaths.load(geo_file))
     return tramnetwork
 
 
 # Bonus task 1: take changes into account and show used tram lines
 
+class SpecializedNetwork(WeightedGraph):
+    '''
+    The tram network with one vertex for each stop and line passing it, so that changes can be counted
+
+    Values: _stop_of : list, the stop of each vertex id
+            _line_of : list, the line of each vertex id
+            _vertex_ids : A dictory, the key is (stop, line), the value is the vertex id, only used to look up ids
+            _stop_vertices : A dictory, the key is stop name(str), the value is the list of its vertex ids
+            _edge_columns : 'weight' is the time and 'distance' the length of riding a line between two stops,
+                            both are nan for changing lines at a stop
+
+    Function: vertex(stop, line): Get the vertex id of a stop on a line
+              stop_of(v), line_of(v): Get the stop and the line of a vertex id
+              stop_vertices(stop): Get the vertex ids of a stop, return list
+              is_change(a, b): Tell if the edge a - b is a change of lines
+              route(a, b, by, change): Get the quickest (by='time') or shortest (by='geo') route between two stops
+                  with the given cost of a change, return list of (stop, line) and the cost
+    '''
+    def __init__(self, network):
+        super().__init__()
+        self._stop_of = list()
+        self._line_of = list()
+        self._vertex_ids = dict()
+        self._stop_vertices = dict()
+        # one pass over the lines: the vertices and the rides between neighbouring stops
+        for line, tramline in network._linedict.items():
+            prev = None
+            for stop in tramline.get_stops():
+                v = self._vertex_ids.get((stop, line))
+                if v is None:
+                    v = len(self._stop_of)
+                    self._vertex_ids[(stop, line)] = v
+                    self._stop_of.append(stop)
+                    self._line_of.append(line)
+                    self._stop_vertices.setdefault(stop, list()).append(v)
+                    self.add_vertex(v)
+                if prev is not None and prev != v:
+                    self.add_edge(prev, v)
+                    self.set_weight(prev, v, network.transition_time(self._stop_of[prev], stop))
+                    self.set_edge_attribute(prev, v, 'distance', network.get_edge_attribute(self._stop_of[prev], stop, 'distance'))
+                prev = v
+        # the changes between the lines at each stop
+        for vertices in self._stop_vertices.values():
+            for i, a in enumerate(vertices):
+                for b in vertices[i+1:]:
+                    self.add_edge(a, b)
+
+    def vertex(self, stop, line):
+        return self._vertex_ids[(stop, str(line))]
+
+    def stop_of(self, v):
+        return self._stop_of[v]
+
+    def line_of(self, v):
+        return self._line_of[v]
+
+    def stop_vertices(self, stop):
+        return list(self._stop_vertices.get(stop, []))
+
+    def is_change(self, a, b):
+        return self._stop_of[a] == self._stop_of[b]
+
+    def _weights(self, by, change):
+        # the costs of the edges of the frozen graph by specialized_transition_time or specialized_geo_distance,
+        # with their own cost of a change if change is None (cached until the graph changes)
+        def build():
+            if by == 'time':
+                cost = specialized_transition_time
+            else:
+                cost = specialized_geo_distance
+            args = () if change is None else (change,)
+            return self.freeze().edge_weights(lambda u, v: cost(self, u, v, *args))
+        return self._cached(('weights', by, change), build)
+
+    def route(self, a, b, by='time', change=None):
+        # one search from all the lines at stop a, ending when a line at stop b is reached
+        path, cost = multi_source_dijkstra(self.freeze(), self._stop_vertices.get(a, []), self._stop_vertices.get(b, []),
+                                           weight=self._weights(by, change))
+        if path is None:
+            return None, cost
+        return [(self._stop_of[v], self._line_of[v]) for v in path], cost
+
+
+# the lines via each stop, sorted as numbers, as tramdata.build_stop_lines builds them for tramnetwork.json
+# in Lab 1; only used when the json file does not have them
+def line_key(line):
+    return (0, int(line), '') if line.isdigit() else (1, 0, line)
+
+
+def build_stop_lines(line_dict):
+    stop_lines = dict()
+    for line in sorted(line_dict, key=line_key):
+        for stop in line_dict[line]:
+            lines = stop_lines.setdefault(stop, list())
+            # a line can pass a stop twice
+            if not lines or lines[-1] != line:
+                lines.append(line)
+    return stop_lines
+
+
+# the positions of the stops on each line and the times from the first stop, as tramdata.build_line_index
+# builds them for tramnetwork.json in Lab 1; only used when the json file does not have them
+def build_line_index(line_dict, time_dict):
+    line_index = dict()
+    for line, stops in line_dict.items():
+        positions = dict()
+        times = [0]
+        for i, stop in enumerate(stops):
+            positions.setdefault(stop, list()).append(i)
+            if i > 0:
+                times.append(times[-1] + time_dict[stops[i-1]][stop])
+        line_index[line] = {'positions': positions, 'times': times}
+    return line_index
+
+
 def specialize_stops_to_lines(network):
-    # TODO: write this function as specified
-    return network
+    # built once for each version of the network, removing lines builds it again
+    return network._cached('specialized', lambda: SpecializedNetwork(network))
 
 
 def specialized_transition_time(spec_network, a, b, changetime=10):
-    # TODO: write this function as specified
-    return changetime
+    if spec_network.is_change(a, b):
+        return changetime
+    return spec_network.get_weight(a, b)
 
 
 def specialized_geo_distance(spec_network, a, b, changedistance=0.02):
-    # TODO: write this function as specified
-    return changedistance
-
-
+    if spec_network.is_change(a, b):
+        return changedistance
+    return spec_network.get_edge_attribute(a, b, 'distance')
@@ -1,14 +1,13 @@
 # baseline tram visualization for Lab 3, modified to work with Django
 
 from .trams import readTramNetwork
-from .graphs import dijkstra
 import graphviz
 import json
 import os
 from django.conf import settings
 
 # to be defined in Bonus task 1, but already included as mock-up
-from .trams import specialize_stops_to_lines, specialized_geo_distance, specialized_transition_time
+from .trams import specialize_stops_to_lines
 
 SHORTEST_PATH_SVG = os.path.join(settings.BASE_DIR,
                         'tram/templates/tram/images/shortest_path.svg')
@@ -80,9 +79,32 @@ def network_graphviz(network, outfile, colors=None, positions=scaled_position):
         file.write(s)
 
 
+# the network is read once, so that its cached graphs are kept between the requests
+_network = None
+
+def tram_network():
+    global _network
+    if _network is None:
+        _network = readTramNetwork()
+    return _network
+
+
+def line_legs(route):
+    # the stops of a specialized route, and the route told as one part for each line
+    stops, parts = [], []
+    for stop, line in route:
+        if stops and stops[-1] == stop:
+            continue
+        if not parts or parts[-1][0] != line:
+            parts.append((line, [stops[-1]] if stops else []))
+        parts[-1][1].append(stop)
+        stops.append(stop)
+    return stops, ', change to '.join('line ' + line + ': ' + ' - '.join(part) for line, part in parts)
+
+
 def show_shortest(dep, dest):
     # TODO: uncomment this when it works with your own code
-    network = readTramNetwork()
+    network = tram_network()
 
     # TODO: replace this mock-up with actual computation using dijkstra.
     # First you need to calculate the shortest and quickest paths, by using appropriate
@@ -90,25 +112,34 @@ def show_shortest(dep, dest):
     # Then you just need to use the lists of stops returned by dijkstra()
     #
     
-    time_sp_dict = dijkstra(network, dep, cost=lambda u, v: network.get_weight(u, v))
-    geo_sp_dict = dijkstra(network, dep, cost=lambda u, v: network.geo_distance(u, v))
+    # the routes on the lines, where the costs (also of changing) are those of specialized_transition_time
+    # and specialized_geo_distance; the specialized network is only built again when the network changes
+    spec_network = specialize_stops_to_lines(network)
+    time_route, _ = spec_network.route(dep, dest, by='time')
+    geo_route, _ = spec_network.route(dep, dest, by='geo')
+    time_path, time_legs = line_legs(time_route or [])
+    geo_path, geo_legs = line_legs(geo_route or [])
     
-    if dest in time_sp_dict:
-        colormap = {str(v): 'orange' for v in time_sp_dict[dest]}
-    if dest in geo_sp_dict:
-        for v in geo_sp_dict[dest]:
+    colormap = dict()
+    if time_path:
+        colormap = {str(v): 'orange' for v in time_path}
+    if geo_path:
+        for v in geo_path:
             if str(v) in colormap:
                 colormap[str(v)] = 'cyan'
             else:
                 colormap[str(v)] = 'green'
 
     
-    # If you do Bonus 1, you could also tell which tram lines you use and where changes
-    # happen. But since this was not mentioned in lab3.md, it is not compulsory.
-    timepath = 'The quickest route from ' + dep + ' to ' + dest + ": " + " - ".join(time_sp_dict[dest])
-    geopath = 'The shortest route from ' + dep + ' to ' + dest + ": " + " - ".join(geo_sp_dict[dest])
+    # the tram lines used and where changes happen
+    timepath = 'The quickest route from ' + dep + ' to ' + dest + ": " + time_legs
+    geopath = 'The shortest route from ' + dep + ' to ' + dest + ": " + geo_legs
+
+    # other routes, in case a part of the quickest one is disrupted, but not the stops of the quickest one again
+    alternatives = ['Alternative route (' + str(time) + ' minutes): ' + " - ".join(path)
+                    for path, time in network.alternative_routes(dep, dest, k=3) if path != time_path][:2]
 
     # TODO: run this with the shortest-path colors to update the svg image
     network_graphviz(network, SHORTEST_PATH_SVG, colors=colormap)
     
-    return timepath, geopath
+    return timepath, geopath, alternatives
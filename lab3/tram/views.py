@@ -13,10 +13,11 @@ def find_route(request):
     if request.method == "POST":
         form = RouteForm(request.POST)
         if form.is_valid():
-            route = form.data
-            timepath, geopath = show_shortest(route['dep'], route['dest'])
+            route = form.cleaned_data
+            timepath, geopath, alternatives = show_shortest(route['dep'], route['dest'])
             return render(request, 'tram/show_route.html',
-                {'route': form.instance.__str__(), 'timepath': timepath, 'geopath': geopath})
+                {'route': form.instance.__str__(), 'timepath': timepath, 'geopath': geopath,
+                 'alternatives': alternatives})
     else:
         form = RouteForm()
     return render(request, 'tram/find_route.html', {'form': form})
@@ -1,5 +1,10 @@
 from hypothesis import given, strategies as st
+import multiprocessing
+import os
+import tempfile
 import hypothesis
+import networkx as nx
+from haversine import haversine
 import graphs as native
 import graphs_baseline as baseline
 
@@ -105,5 +110,465 @@ def test(edges_with_weight):
                     assert path_a_t[vtx_b] == path_a[vtx_b] or len(path_a_t[vtx_b]) == len(path_a[vtx_b])
                     assert path_b_t[vtx_a] == path_b[vtx_a] or len(path_b_t[vtx_a]) == len(path_b[vtx_a])
 
+@hypothesis.settings(deadline=None)
+@given(st.lists(twoints), st.lists(smallints), st.lists(twoints))
+def test_mutations(eds, removed_vertices, removed_edges):
+    G_base = baseline.Graph(eds)
+    G_native = native.Graph(eds)
+    frozen = G_native.freeze()
+    assert G_native.freeze() is frozen
+    for a, b in removed_edges:
+        if G_base.has_edge(a, b):
+            G_base.remove_edge(a, b)
+        G_native.remove_edge(a, b)
+    for v in removed_vertices:
+        if v in G_base:
+            G_base.remove_vertex(v)
+        G_native.remove_vertex(v)
+    # the counts and the cached views follow the mutations
+    assert set(G_base.vertices()) == set(G_native.vertices())
+    assert equal(G_base.edges(), G_native.edges())
+    assert G_native.number_of_edges() == len(G_native.edges()) == G_base.number_of_edges()
+    for v in G_native.vertices():
+        assert G_native.neighbours(v) == sorted(G_base.neighbors(v))
+    assert G_native.freeze().edges() == G_native.edges()
+
+def test_attribute_columns():
+    G = native.WeightedGraph([(1,2),(2,3),(3,4)])
+    G.set_weights([(1,2),(3,2),(3,4),(7,8)], [1.5, 2.5, 3.5, 4.5])
+    assert G.weights_array().tolist() == [1.5, 2.5, 3.5]
+    assert G.weights_array([(4,3),(2,1)]).tolist() == [3.5, 1.5]
+    assert G.get_weight(2, 3) == G.get_weight(3, 2) == 2.5
+    assert G[2] == {'_value': None, 1: {'weight': 1.5}, 3: {'weight': 2.5}}
+    G.set_vertex_values([1, 2], ['a', 'b'])
+    assert G.vertex_values() == ['a', 'b', None, None]
+    # the ids of removed vertices and edges are reused, without their attributes
+    G.remove_vertex(1)
+    G.add_edge(4, 5)
+    assert len(G._values) == 4 and len(G._edge_columns['weight']) == 3
+    assert G.get_vertex_value(5) is None
+    assert G.get_weight(4, 5) == "The weight between 4 and 5 has not been set"
+    assert G.weights_array([(2,3),(3,4)]).tolist() == [2.5, 3.5]
+
+def test_dijkstra_target_and_max_cost():
+    G = native.WeightedGraph([(1,2),(2,3),(3,4),(1,5),(5,4),(4,6)])
+    full = native.dijkstra(G, 1)
+    # stopping at the target gives the same path as the full search
+    early = native.dijkstra(G, 1, target=4)
+    assert len(early[4]) == len(full[4]) == 3
+    assert 6 not in early
+    # nothing further away than max_cost is returned
+    bounded = native.dijkstra(G, 1, max_cost=2)
+    assert set(bounded) == {2, 3, 5, 4}
+    assert all(len(path) - 1 <= 2 for path in bounded.values())
+    # unknown source
+    assert native.dijkstra(G, 42) == {}
+
+def test_shortest_path_tree():
+    G = native.WeightedGraph([(1,2),(2,3),(3,4),(5,6)])
+    tree = native.dijkstra(G, 1)
+    # looks like the old dictionary of paths
+    assert dict(tree) == {2: [1,2], 3: [1,2,3], 4: [1,2,3,4]}
+    assert 1 not in tree and 5 not in tree
+    assert tree.path(4) == tree[4] and tree.cost(4) == 3
+    assert tree.path(1) == [1] and tree.cost(1) == 0
+    assert tree.path(6) is None and tree.cost(6) == float('inf')
+
+@hypothesis.settings(deadline=None)
+@given(st_edge_list_with_weight)
+def test_frozen(edges_with_weight):
+    G = native.WeightedGraph([edge for edge, _ in edges_with_weight])
+    for (a, b), w in edges_with_weight:
+        G.set_weight(a, b, w)
+    F = G.freeze()
+    assert len(F) == len(G)
+    assert F.vertices() == G.vertices()
+    assert F.edges() == G.edges()
+    for a in G.vertices():
+        assert F.neighbours(a) == G.neighbours(a)
+        for b in G.neighbours(a):
+            assert F.get_weight(a, b) == G.get_weight(a, b)
+        assert native.bfs(F, a) == native.bfs(G, a)
+        tree_f = native.dijkstra(F, a, cost=lambda u, v: G.get_weight(u, v))
+        tree_g = native.dijkstra(G, a, cost=lambda u, v: G.get_weight(u, v))
+        assert set(tree_f) == set(tree_g)
+        for b in tree_g:
+            assert abs(tree_f.cost(b) - tree_g.cost(b)) < 1e-9
+        # reading the weights from the graph gives the same costs as the cost function
+        tree_gw = native.dijkstra(G, a, weight='weight')
+        tree_fw = native.dijkstra(F, a, weight='weight')
+        tree_fa = native.dijkstra(F, a, weight=F.edge_weights(lambda u, v: G.get_weight(u, v)))
+        for tree in [tree_gw, tree_fw, tree_fa]:
+            assert set(tree) == set(tree_g)
+            for b in tree_g:
+                assert abs(tree.cost(b) - tree_g.cost(b)) < 1e-9
+    # an edge without a weight is told the same way
+    G.add_edge(11, 12)
+    assert G.freeze().get_weight(11, 12) == G.get_weight(11, 12) == "The weight between 11 and 12 has not been set"
+
+@hypothesis.settings(deadline=None)
+@given(st_edge_list_with_weight, st.lists(smallints, max_size=3), st.lists(smallints, max_size=3))
+def test_multi_source_dijkstra(edges_with_weight, sources, targets):
+    G = native.WeightedGraph([edge for edge, _ in edges_with_weight])
+    for (a, b), w in edges_with_weight:
+        G.set_weight(a, b, w)
+    stats = native.SearchStats()
+    path, cost = native.multi_source_dijkstra(G, sources, targets, weight='weight', stats=stats)
+    assert stats.searches == 1
+    # the nearest of the targets from the nearest of the sources
+    best = min([native.dijkstra(G, a, weight='weight').cost(b) for a in sources if a in G for b in targets] + [float('inf')])
+    assert abs(cost - best) < 1e-9 if best < float('inf') else (path, cost) == (None, float('inf'))
+    if path is not None:
+        assert path[0] in sources and path[-1] in targets
+        assert abs(sum(G.get_weight(u, v) for u, v in zip(path, path[1:])) - cost) < 1e-9
+
+def test_unset_weights():
+    G = native.WeightedGraph([(1, 2), (2, 3), (4, 5)])
+    G.set_weight(1, 2, 1.0)
+    # searches reading an unset weight tell which edge it is, on the graph and on its snapshot
+    for graph in [G, G.freeze()]:
+        for search in [lambda: native.dijkstra(graph, 1, weight='weight'),
+                       lambda: native.astar(graph, 1, 3, lambda u, t: 0, weight='weight'),
+                       lambda: native.bidirectional_dijkstra(graph, 1, 3, weight='weight'),
+                       lambda: native.k_shortest_paths(graph, 1, 3, 2, weight='weight'),
+                       lambda: native.shortest_path_matrix(graph, [1], weight='weight')]:
+            try:
+                search()
+                assert False, 'an unset weight was read'
+            except ValueError as error:
+                # (the backward searches read the edge from 3)
+                assert str(error) in ["The weight between 2 and 3 has not been set",
+                                      "The weight between 3 and 2 has not been set"]
+    # the set weights can still be searched
+    assert native.dijkstra(G, 1, target=2, weight='weight').cost(2) == 1.0
+    # other edge attributes get their own columns, copied by freeze
+    G.set_edge_attributes([(1, 2), (2, 3)], 'distance', [0.5, 0.25])
+    G.set_edge_attribute(4, 5, 'distance', 2.0)
+    assert G.get_edge_attribute(3, 2, 'distance') == 0.25 and G.get_edge_attribute(1, 2, 'color') is None
+    F = G.freeze()
+    assert F.get_edge_attribute(2, 3, 'distance') == 0.25 and F.get_edge_attribute(2, 3, 'weight') is None
+    assert native.dijkstra(F, 1, weight='distance').cost(3) == native.dijkstra(G, 1, weight='distance').cost(3) == 0.75
+    G.add_edge(5, 6)
+    assert G.get_edge_attribute(5, 6, 'distance') is None
+
+@hypothesis.settings(deadline=None)
+@given(st_edge_list_with_weight)
+def test_astar(edges_with_weight):
+    G = native.WeightedGraph([edge for edge, _ in edges_with_weight])
+    for (a, b), w in edges_with_weight:
+        G.set_weight(a, b, w)
+    # vertices on a line, the straight distance never overestimates weights >= 10
+    h = lambda u, t: abs(u - t)
+    for a in G.vertices():
+        tree = native.dijkstra(G, a, weight='weight')
+        for b in G.vertices():
+            path, cost = native.astar(G, a, b, h, weight='weight')
+            if b not in tree and b != a:
+                assert path is None and cost == float('inf')
+                continue
+            assert abs(cost - tree.cost(b)) < 1e-9
+            assert path == tree.path(b) or len(path) == len(tree.path(b))
+
+@hypothesis.settings(deadline=None)
+@given(st_edge_list_with_weight)
+def test_bidirectional_dijkstra(edges_with_weight):
+    eds = [edge for edge, _ in edges_with_weight]
+    G_native = native.WeightedGraph(eds)
+    G_base = baseline.WeightedGraph(eds)
+    for (a, b), w in edges_with_weight:
+        G_native.set_weight(a, b, w)
+        G_base.set_weight(a, b, w)
+    for a in G_native.vertices():
+        tree = native.dijkstra(G_native, a, weight='weight')
+        paths_base = baseline.dijkstra(G_base, a, cost=lambda u, v: G_base.get_weight(u, v))
+        for b in G_native.vertices():
+            path, cost = native.bidirectional_dijkstra(G_native, a, b, weight='weight')
+            if b not in paths_base:
+                assert path is None and cost == float('inf')
+                continue
+            assert path[0] == a and path[-1] == b
+            # the returned cost is the cost of the returned path
+            assert abs(cost - sum(G_native.get_weight(u, v) for u, v in zip(path, path[1:]))) < 1e-9
+            # and the same as dijkstra and networkx
+            assert abs(cost - tree.cost(b)) < 1e-9
+            base_path = paths_base[b]
+            assert abs(cost - sum(G_base.get_weight(u, v) for u, v in zip(base_path, base_path[1:]))) < 1e-9
+
+@hypothesis.settings(deadline=None)
+@given(st_edge_list_with_weight)
+def test_contraction_hierarchy(edges_with_weight):
+    G = native.WeightedGraph([edge for edge, _ in edges_with_weight])
+    for (a, b), w in edges_with_weight:
+        G.set_weight(a, b, w)
+    ch = native.ContractionHierarchy(G, weight='weight')
+    with tempfile.TemporaryDirectory() as tmpdir:
+        filename = os.path.join(tmpdir, 'ch.json')
+        ch.save(filename)
+        loaded = native.ContractionHierarchy.load(filename)
+    assert set(loaded.vertices()) == set(G.vertices())
+    for a in G.vertices():
+        tree = native.dijkstra(G, a, weight='weight')
+        for b in G.vertices():
+            for hierarchy in [ch, loaded]:
+                path, cost = hierarchy.query(a, b)
+                if b != a and b not in tree:
+                    assert path is None and cost == float('inf')
+                    continue
+                # the shortcuts are unpacked to edges of the graph
+                assert path[0] == a and path[-1] == b
+                assert abs(cost - sum(G.get_weight(u, v) for u, v in zip(path, path[1:]))) < 1e-9
+                assert abs(cost - tree.cost(b)) < 1e-9
+
+@hypothesis.settings(deadline=None)
+@given(st_edge_list_with_weight)
+def test_all_pairs_paths(edges_with_weight):
+    G = native.WeightedGraph([edge for edge, _ in edges_with_weight])
+    for (a, b), w in edges_with_weight:
+        G.set_weight(a, b, w)
+    paths = native.AllPairsPaths(G, weight='weight')
+    with tempfile.TemporaryDirectory() as tmpdir:
+        filename = os.path.join(tmpdir, 'paths.bin')
+        paths.save(filename)
+        loaded = native.AllPairsPaths.load(filename)
+    assert loaded.vertices() == paths.vertices()
+    for a in G.vertices():
+        tree = native.dijkstra(G, a, weight='weight')
+        for b in G.vertices():
+            for table in [paths, loaded]:
+                assert abs(table.cost(a, b) - tree.cost(b)) < 1e-9 or table.cost(a, b) == tree.cost(b)
+                path = table.path(a, b)
+                if tree.path(b) is None:
+                    assert path is None
+                    continue
+                assert path[0] == a and path[-1] == b
+                assert abs(sum(G.get_weight(u, v) for u, v in zip(path, path[1:])) - tree.cost(b)) < 1e-9
+
+def test_shortest_path_matrix():
+    G = native.WeightedGraph([(1,2),(2,3),(3,4),(1,4),(5,6)])
+    for (a, b), w in zip([(1,2),(2,3),(3,4),(1,4),(5,6)], [1, 2, 4, 10, 3]):
+        G.set_weight(a, b, w)
+    sources, targets = [1, 3, 5], [1, 2, 4, 6]
+    expected = [[0, 1, 7, float('inf')],
+                [3, 2, 4, float('inf')],
+                [float('inf'), float('inf'), float('inf'), 3]]
+    assert native.shortest_path_matrix(G, sources, targets, weight='weight').tolist() == expected
+    # the same in two worker processes, with the graph sent once to each
+    assert native.shortest_path_matrix(G, sources, targets, weight='weight', workers=2).tolist() == expected
+    # processes started by spawn (the default on macOS and Windows) get everything by pickling
+    spawn = multiprocessing.get_context('spawn')
+    assert native.shortest_path_matrix(G, sources, targets, weight='weight', workers=2, mp_context=spawn).tolist() == expected
+    assert native.shortest_path_matrix(G, [1], [4], workers=1, mp_context=spawn).tolist() == [[1]]
+    # all vertices as targets by default
+    assert native.shortest_path_matrix(G, [1]).shape == (1, 6)
+
+def test_search_stats():
+    G = native.WeightedGraph([(1,2),(2,3),(3,4),(1,4),(4,5)])
+    for a, b in G.edges():
+        G.set_weight(a, b, 1)
+    events = list()
+    stats = native.SearchStats()
+    stats.subscribe(lambda engine, phase, counters: events.append((engine, phase)))
+    # with a cost function every relaxation calls it
+    tree = native.dijkstra(G, 1, stats=stats)
+    assert stats.searches == 1 and stats.settled == 5
+    assert stats.cost_calls == stats.relaxations > 0
+    assert stats.pushes >= stats.pops >= stats.settled
+    tree.path(5)
+    assert stats.path_time > 0
+    assert events == [('dijkstra', 'search'), ('dijkstra', 'path')]
+    # reading the weights from the graph calls no cost function, also on a frozen graph
+    for graph in [G, G.freeze()]:
+        native.dijkstra(graph, 1, weight='weight', stats=stats)
+        assert stats.last['cost_calls'] == 0 and stats.last['settled'] == 5
+    # the other engines report the same counters
+    native.astar(G, 1, 5, lambda u, t: 0, weight='weight', stats=stats)
+    native.bidirectional_dijkstra(G, 1, 5, weight='weight', stats=stats)
+    native.ContractionHierarchy(G, weight='weight').query(1, 5, stats=stats)
+    native.bfs(G, 1, stats=stats)
+    assert [engine for engine, phase in events[4:]] == ['astar', 'bidirectional_dijkstra', 'contraction_hierarchy', 'bfs']
+    assert stats.searches == 7
+    assert set(stats.as_dict()) == set(native.SearchStats.COUNTERS)
+
+def test_geo_distances():
+    gbg, sthlm = (57.7089, 11.9746), (59.3293, 18.0686)
+    assert abs(native.haversine_distance(gbg, sthlm) - haversine(gbg, sthlm)) < 1e-3
+    assert abs(native.equirectangular_distance(gbg, sthlm) - native.haversine_distance(gbg, sthlm)) < 2
+    h = native.time_heuristic(lambda v: v, 2.0)
+    assert h(gbg, sthlm) == native.haversine_distance(gbg, sthlm) / 2.0
+
+# generate directed edges with a label (one of three airlines)
+labelled_edges = st.lists(st.tuples(twoints, st.sampled_from('ABC'), weights_random))
+
+@hypothesis.settings(deadline=None)
+@given(labelled_edges)
+def test_directed(labelled_edges):
+    G = native.DiGraph()
+    M = native.MultiDiGraph()
+    G_nx = nx.DiGraph()
+    M_nx = nx.MultiDiGraph()
+    for (a, b), label, w in labelled_edges:
+        G.add_edge(a, b, label=label)
+        G.set_weight(a, b, w)
+        G_nx.add_edge(a, b, weight=w, label=label)
+        # parallel flights share the weight of the route
+        M.add_edge(a, b, label=label)
+        if M_nx.has_edge(a, b):
+            w = M_nx[a][b][0]['weight']
+        M.set_weight(a, b, w)
+        M_nx.add_edge(a, b, weight=w, label=label)
+    assert G.is_directed() and not native.Graph().is_directed()
+    assert sorted(G.edges()) == sorted(G_nx.edges())
+    assert G.number_of_edges() == G_nx.number_of_edges()
+    assert M.number_of_edges() == M_nx.number_of_edges()
+    for v in G.vertices():
+        assert G.neighbours(v) == sorted(G_nx.successors(v))
+        assert G.predecessors(v) == sorted(G_nx.predecessors(v))
+    for a, b in M.edges():
+        assert sorted(M.edge_labels(a, b)) == sorted(d['label'] for d in M_nx[a][b].values())
+        assert G.edge_labels(a, b) == [G_nx[a][b]['label']]
+    for graph, graph_nx in [(G, G_nx), (M, M_nx)]:
+        frozen = graph.freeze()
+        assert sorted(frozen.edges()) == sorted(graph.edges())
+        for a in graph.vertices():
+            costs = nx.single_source_dijkstra_path_length(graph_nx, a)
+            tree = native.dijkstra(graph, a, weight='weight')
+            frozen_tree = native.dijkstra(frozen, a, weight='weight')
+            assert set(tree) | {a} == set(costs)
+            for b in costs:
+                assert abs(tree.cost(b) - costs[b]) < 1e-9
+                assert abs(frozen_tree.cost(b) - costs[b]) < 1e-9
+            assert native.bfs(graph, a) == nx.single_source_shortest_path_length(graph_nx, a)
+    # removing one airline keeps the other flights of a route
+    for a, b in list(M.edges()):
+        labels = M.edge_labels(a, b)
+        M.remove_edge(a, b, label=labels[0])
+        assert M.multiplicity(a, b) == len(labels) - 1
+    for v in list(G.vertices())[::2]:
+        G.remove_vertex(v)
+        G_nx.remove_node(v)
+    assert sorted(G.edges()) == sorted(G_nx.edges())
+    assert G.number_of_edges() == G_nx.number_of_edges()
+
+@hypothesis.settings(deadline=None)
+@given(st_edge_list_with_weight, st.booleans())
+def test_k_shortest_paths(edges_with_weight, directed):
+    G = native.DiGraph() if directed else native.WeightedGraph()
+    G_nx = nx.DiGraph() if directed else nx.Graph()
+    for (a, b), w in edges_with_weight:
+        G.add_edge(a, b)
+        G.set_weight(a, b, w)
+        G_nx.add_edge(a, b, weight=w)
+    for a in G.vertices()[:3]:
+        for b in G.vertices():
+            paths = native.k_shortest_paths(G, a, b, 4, weight='weight')
+            if not nx.has_path(G_nx, a, b):
+                assert paths == []
+                continue
+            expected = list()
+            for path in nx.shortest_simple_paths(G_nx, a, b, weight='weight'):
+                expected.append(nx.path_weight(G_nx, path, weight='weight'))
+                if len(expected) == 4:
+                    break
+            assert len(paths) == len(expected)
+            assert len(set(tuple(path) for path, _ in paths)) == len(paths)
+            for (path, cost), expected_cost in zip(paths, expected):
+                # loopless paths from a to b, with the costs of networkx
+                assert path[0] == a and path[-1] == b and len(set(path)) == len(path)
+                assert abs(cost - sum(G.get_weight(u, v) for u, v in zip(path, path[1:]))) < 1e-9
+                assert abs(cost - expected_cost) < 1e-9
+    # the cost function gives the same paths as the weights
+    if len(G):
+        a, b = G.vertices()[0], G.vertices()[-1]
+        assert native.k_shortest_paths(G, a, b, 3, cost=G.get_weight) == native.k_shortest_paths(G, a, b, 3, weight='weight')
+
+@hypothesis.settings(deadline=None)
+@given(st.lists(twoints), st.lists(smallints), st.lists(twoints), st.lists(twoints))
+def test_components(eds, removed_vertices, removed_edges, added_edges):
+    G = native.WeightedGraph(eds)
+    G_nx = nx.Graph(eds)
+    for v in removed_vertices:
+        G.remove_vertex(v)
+        if v in G_nx:
+            G_nx.remove_node(v)
+    for a, b in removed_edges:
+        G.remove_edge(a, b)
+        if G_nx.has_edge(a, b):
+            G_nx.remove_edge(a, b)
+    # the removals are seen when the components are looked up again, after some more edges
+    for a, b in added_edges:
+        G.add_edge(a, b)
+        G_nx.add_edge(a, b)
+        assert G.same_component(a, b)
+    components = list(nx.connected_components(G_nx))
+    assert sorted(map(sorted, G.components())) == sorted(map(sorted, components))
+    frozen = G.freeze()
+    for a in G.vertices():
+        for b in G.vertices():
+            assert G.same_component(a, b) == frozen.same_component(a, b) == nx.has_path(G_nx, a, b)
+    assert not G.same_component(0, 11) and not frozen.same_component(0, 11)
+    # the searches between components stop at once
+    for component in components:
+        for other in components:
+            if component is not other:
+                a, b = min(component), min(other)
+                stats = native.SearchStats()
+                assert native.bidirectional_dijkstra(G, a, b, stats=stats) == (None, float('inf'))
+                assert native.astar(G, a, b, lambda u, v: 0, stats=stats) == (None, float('inf'))
+                assert native.k_shortest_paths(G, a, b, 2, stats=stats) == []
+                tree = native.dijkstra(G, a, target=b, stats=stats)
+                assert tree.cost(b) == float('inf') and len(tree) == 0
+                # the rejected searches are still counted, without any work
+                assert stats.searches == 4 and stats.settled == 0
+                assert stats.last['engine'] == 'dijkstra'
+
+def edit_distance(a, b):
+    # the textbook dynamic programme, without bounds
+    prev = list(range(len(b)+1))
+    for i in range(1, len(a)+1):
+        cur = [i] + [0] * len(b)
+        for j in range(1, len(b)+1):
+            cur[j] = min(prev[j-1] + (a[i-1] != b[j-1]), prev[j] + 1, cur[j-1] + 1)
+        prev = cur
+    return prev[-1]
+
+names = st.text(alphabet='abcÅäö ', max_size=8)
+
+@hypothesis.settings(deadline=None)
+@given(st.lists(names, max_size=15), names, st.integers(min_value=0, max_value=3))
+def test_name_index(name_list, name, bound):
+    index = native.NameIndex(name_list)
+    key = native.normalize_name(name)
+    keys = {other: native.normalize_name(other) for other in name_list}
+    assert sorted(index.find(name)) == sorted(other for other in name_list if keys[other] == key)
+    assert sorted(index.prefix(name)) == sorted(other for other in name_list if keys[other].startswith(key))
+    for other in name_list:
+        distance = edit_distance(key, keys[other])
+        assert native.bounded_edit_distance(key, keys[other], bound) == (distance if distance <= bound else None)
+    similar = index.similar(name, bound)
+    assert sorted(similar) == sorted(other for other in name_list if edit_distance(key, keys[other]) <= bound)
+    assert [edit_distance(key, keys[other]) for other in similar] == sorted(edit_distance(key, keys[other]) for other in similar)
+    if name in name_list:
+        assert index.resolve(name) == name
+    assert native.normalize_name('Östra  Sjukhuset ') == 'ostra sjukhuset'
+
+
 if __name__ == '__main__':
-    test()
\ No newline at end of file
+    test()
+    test_mutations()
+    test_attribute_columns()
+    test_dijkstra_target_and_max_cost()
+    test_shortest_path_tree()
+    test_frozen()
+    test_unset_weights()
+    test_multi_source_dijkstra()
+    test_astar()
+    test_bidirectional_dijkstra()
+    test_contraction_hierarchy()
+    test_all_pairs_paths()
+    test_shortest_path_matrix()
+    test_search_stats()
+    test_geo_distances()
+    test_directed()
+    test_k_shortest_paths()
+    test_components()
+    test_name_index()
@@ -0,0 +1,151 @@
+import tram
+import timetable as tt
+import hypothesis
+from hypothesis import given, strategies as st
+
+TRAMLINES_FILE = './data/tramlines.txt'
+
+def brute_force_arrival(timetable, a, b, depart_at):
+    # relax all connections until nothing changes
+    earliest = {stop: float('inf') for stop in timetable.stops()}
+    earliest[a] = depart_at
+    changed = True
+    while changed:
+        changed = False
+        for c in range(len(timetable)):
+            dep, arr = timetable._stops[timetable._dep_stop[c]], timetable._stops[timetable._arr_stop[c]]
+            if timetable._dep_time[c] >= depart_at and earliest[dep] <= timetable._dep_time[c] \
+                    and timetable._arr_time[c] < earliest[arr]:
+                earliest[arr] = timetable._arr_time[c]
+                changed = True
+    return None if earliest[b] == float('inf') else earliest[b]
+
+def brute_force_rounds(timetable, a, b, depart_at, rounds):
+    # the earliest arrival at b with at most k trams, for k = 1...rounds, riding each trip of the timetable
+    trips = dict()
+    for c in range(len(timetable)):
+        trips.setdefault(timetable._trip[c], list()).append(c)
+    labels = {stop: float('inf') for stop in timetable.stops()}
+    labels[a] = depart_at
+    arrivals = list()
+    for _ in range(rounds):
+        new_labels = dict(labels)
+        for connections in trips.values():
+            on_board = False
+            for c in connections:
+                dep, arr = timetable._stops[timetable._dep_stop[c]], timetable._stops[timetable._arr_stop[c]]
+                on_board = on_board or labels[dep] <= timetable._dep_time[c]
+                if on_board:
+                    new_labels[arr] = min(new_labels[arr], timetable._arr_time[c])
+        labels = new_labels
+        arrivals.append(labels[b])
+    return arrivals
+
+def test_clock():
+    assert tt.parse_clock('10:05') == 605
+    assert tt.parse_clock(605) == 605
+    assert tt.format_clock(605) == '10:05'
+
+def test_line_times():
+    with open(TRAMLINES_FILE, 'r', encoding='utf-8') as f:
+        line_times = tt.build_line_times(f)
+    network = tram.readTramNetwork()
+    assert set(line_times) == set(network.all_lines())
+    for line, times in line_times.items():
+        assert [stop for stop, _ in times] == network.line_stops(line)
+        assert times[0][1] == 0
+        for (a, t), (b, u) in zip(times, times[1:]):
+            assert u - t == network.transition_time(a, b)
+
+def test_night_line():
+    # the clock times of a line may pass midnight
+    line_times = tt.build_line_times(['1:\n', 'Night Stop 23:58\n', 'Day Stop 0:03\n'])
+    assert line_times == {'1': [('Night Stop', 0), ('Day Stop', 5)]}
+    timetable = tt.Timetable(line_times, start='23:00', end='23:30')
+    assert timetable.earliest_arrival('Night Stop', 'Day Stop', '23:05') == 23 * 60 + 15
+
+def test_every_minute():
+    # with a tram every minute there is no waiting, the arrival is after the quickest route
+    timetable = tt.read_timetable(headway=1, start='07:00', end='10:00')
+    network = tram.readTramNetwork()
+    stops = network.all_stops()
+    for a in stops[::9]:
+        tree = tram.gr.dijkstra(network, a, weight='weight')
+        for b in stops:
+            assert timetable.earliest_arrival(a, b, '08:00') == 480 + tree.cost(b)
+
+@hypothesis.settings(max_examples=20, deadline=None)
+@given(st.integers(min_value=0, max_value=132), st.integers(min_value=0, max_value=132),
+       st.integers(min_value=300, max_value=1500), st.dictionaries(st.sampled_from(['1', '3', '6', '11']),
+                                                                  st.integers(min_value=5, max_value=30)))
+def test_earliest_arrival(i, j, depart_at, headway):
+    timetable = tt.read_timetable(headway=headway, start='05:00', end='06:30')
+    stops = timetable.stops()
+    a, b = stops[i % len(stops)], stops[j % len(stops)]
+    arrival = timetable.earliest_arrival(a, b, depart_at)
+    assert arrival == brute_force_arrival(timetable, a, b, depart_at)
+    legs = timetable.journey(a, b, depart_at)
+    if arrival is None:
+        assert legs is None
+        return
+    # the legs follow each other, on the lines that run between the stops
+    assert arrival >= depart_at
+    at, time = a, depart_at
+    for line, dep_stop, dep, dest_stop, arr in legs:
+        assert dep_stop == at and dep >= time and arr >= dep
+        at, time = dest_stop, arr
+    assert at == b and (time == arrival if legs else arrival == depart_at)
+
+@hypothesis.settings(max_examples=20, deadline=None)
+@given(st.integers(min_value=0, max_value=132), st.integers(min_value=0, max_value=132),
+       st.integers(min_value=300, max_value=400), st.dictionaries(st.sampled_from(['1', '3', '6', '11']),
+                                                                 st.integers(min_value=5, max_value=30)))
+def test_raptor(i, j, depart_at, headway):
+    network = tram.readTramNetwork()
+    raptor = tt.Raptor(network, headway=headway, start='05:00', end='06:30')
+    timetable = tt.read_timetable(headway=headway, start='05:00', end='06:30')
+    stops = network.all_stops()
+    a, b = stops[i % len(stops)], stops[j % len(stops)]
+    journeys = raptor.journeys(a, b, depart_at, max_transfers=4)
+    if a == b:
+        assert journeys == [(depart_at, 0, [])]
+        return
+    # the journeys are the Pareto set: with k transfers only if it is quicker than with fewer transfers
+    expected = list()
+    for k, arrival in enumerate(brute_force_rounds(timetable, a, b, depart_at, 5)):
+        if arrival < min([arr for arr, _ in expected], default=float('inf')):
+            expected.append((arrival, k))
+    assert [(arrival, transfers) for arrival, transfers, _ in journeys] == expected
+    for arrival, transfers, legs in journeys:
+        assert len(legs) == transfers + 1
+        at, time = a, depart_at
+        for line, dep_stop, dep, dest_stop, arr in legs:
+            # each leg runs along its line, with the times of the line
+            assert dep_stop == at and dep >= time and dep_stop in network.line_stops(line)
+            assert dest_stop in network.line_stops(line)
+            at, time = dest_stop, arr
+        assert at == b and time == arrival
+    # the quickest journey arrives as early as the connection scan
+    if journeys:
+        assert journeys[-1][0] == timetable.earliest_arrival(a, b, depart_at)
+    else:
+        assert timetable.earliest_arrival(a, b, depart_at) is None
+
+def test_memory():
+    timetable = tt.read_timetable()
+    # 5 minutes to midnight every 10 minutes, in both directions
+    network = tram.readTramNetwork()
+    assert len(timetable) == 2 * 114 * sum(len(network.line_stops(line)) - 1 for line in network.all_lines())
+    assert timetable.nbytes() <= 12 * len(timetable)
+
+def main():
+    test_clock()
+    test_line_times()
+    test_night_line()
+    test_every_minute()
+    test_earliest_arrival()
+    test_raptor()
+    test_memory()
+
+if __name__ == '__main__':
+    main()
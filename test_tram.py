@@ -1,8 +1,16 @@
 import tram
+import tramdata
 import json
+import os
+import tempfile
 import hypothesis
+import networkx as nx
+from itertools import islice
 from hypothesis import given, strategies as st
 
+TRAMSTOPS_FILE = './data/tramstops.json'
+TRAMLINES_FILE = './data/tramlines.txt'
+
 gener_int = st.integers(min_value=0, max_value=100)
 alphabet = [chr(i) for i in range(65,91)]+[chr(i) for i in range(97,123)]
 gener_strings = st.text(alphabet=alphabet, min_size=6, max_size=9)
@@ -64,11 +72,181 @@ def connectedness_test():
     assert len(list(set(all_stops))) == len(list(times.keys()))
     assert set(all_stops) == set(list(times.keys()))
 
+def test_frozen_network():
+    network = tram.readTramNetwork()
+    frozen = network.freeze()
+    start = network.all_stops()[0]
+    # the network is connected, also when searched on the frozen snapshot
+    assert set(tram.gr.bfs(frozen, start)) == set(network.all_stops())
+    time_f = tram.gr.dijkstra(frozen, start, cost=lambda u, v: network.get_weight(u, v))
+    time_n = tram.gr.dijkstra(network, start, cost=lambda u, v: network.get_weight(u, v))
+    for stop in time_n:
+        assert time_f.cost(stop) == time_n.cost(stop)
+
+def test_astar_network():
+    network = tram.readTramNetwork()
+    frozen = network.freeze()
+    position = network.stop_position
+    time_h = tram.gr.time_heuristic(position, tram.gr.max_speed(frozen, position, weight='weight'))
+    geo_h = tram.gr.geo_heuristic(position, distance=tram.gr.equirectangular_distance)
+    geo_weights = frozen.edge_weights(network.geo_distance)
+    stops = network.all_stops()
+    # A* settles fewer stops than dijkstra
+    astar_stats, dijkstra_stats = tram.gr.SearchStats(), tram.gr.SearchStats()
+    for a in stops[::10]:
+        for b in stops[::10]:
+            tram.gr.astar(frozen, a, b, geo_h, weight=geo_weights, stats=astar_stats)
+            tram.gr.dijkstra(frozen, a, target=b, weight=geo_weights, stats=dijkstra_stats)
+    assert astar_stats.settled < dijkstra_stats.settled
+    for a in stops[::10]:
+        time_tree = tram.gr.dijkstra(frozen, a, weight='weight')
+        geo_tree = tram.gr.dijkstra(frozen, a, weight=geo_weights)
+        for b in stops:
+            assert tram.gr.astar(frozen, a, b, time_h, weight='weight')[1] == time_tree.cost(b)
+            assert abs(tram.gr.astar(frozen, a, b, geo_h, weight=geo_weights)[1] - geo_tree.cost(b)) < 1e-9
+
+def read_built_network(tmp):
+    # the network read back from the files written by tramdata.py init, built afresh in tmp
+    tramfile = os.path.join(tmp, 'tramnetwork.json')
+    tramdata.build_tram_network(TRAMSTOPS_FILE, TRAMLINES_FILE, tramfile)
+    return tram.readTramNetwork(tramfile)
+
+def test_quickest_route():
+    # the hierarchy is built by tramdata.py init together with tramnetwork.json
+    with tempfile.TemporaryDirectory() as tmp:
+        network = read_built_network(tmp)
+    assert network._hierarchy is not None
+    stops = network.all_stops()
+    for a in stops[::5]:
+        tree = tram.gr.dijkstra(network, a, weight='weight')
+        for b in stops:
+            path, time = network.quickest_route(a, b)
+            assert time == tree.cost(b)
+            assert time == sum(network.transition_time(u, v) for u, v in zip(path, path[1:]))
+    # removing lines invalidates the hierarchy
+    network.remove_lines(['1'])
+    assert network._hierarchy is None
+
+def test_matrices():
+    # the tables are built by tramdata.py init together with tramnetwork.json
+    with tempfile.TemporaryDirectory() as tmp:
+        network = read_built_network(tmp)
+    assert network._time_paths is not None and network._geo_paths is not None
+    stops = network.all_stops()
+    for a in stops[::5]:
+        for b in stops:
+            if a == b:
+                continue
+            assert network.shortest_time(a, b) == network.quickest_route(a, b)[1]
+            path = network.route(a, b)
+            assert sum(network.transition_time(u, v) for u, v in zip(path, path[1:])) == network.shortest_time(a, b)
+            assert abs(network.shortest_distance(a, b) - network.shortest_route(a, b)[1]) < 1e-9
+            path = network.route(a, b, by='geo')
+            assert abs(sum(network.geo_distance(u, v) for u, v in zip(path, path[1:])) - network.shortest_distance(a, b)) < 1e-9
+
+def test_alternative_routes():
+    network = tram.readTramNetwork()
+    G_nx = nx.Graph()
+    for a, b in network.edges():
+        G_nx.add_edge(a, b, weight=network.transition_time(a, b))
+    stops = network.all_stops()
+    for a in stops[::10]:
+        for b in stops[::7]:
+            routes = network.alternative_routes(a, b, k=3)
+            if a == b:
+                assert routes == [([a], 0)]
+                continue
+            # the first route is the quickest, the next ones are other loopless routes, not quicker,
+            # there are fewer than 3 only on the branches out to a terminus
+            assert routes[0][1] == network.quickest_route(a, b)[1]
+            expected = list(islice(nx.shortest_simple_paths(G_nx, a, b, weight='weight'), 3))
+            assert len(set(tuple(path) for path, _ in routes)) == len(routes) == len(expected)
+            for (path, time), path_nx in zip(routes, expected):
+                assert len(set(path)) == len(path)
+                assert time == sum(network.transition_time(u, v) for u, v in zip(path, path[1:]))
+                assert time == nx.path_weight(G_nx, path_nx, weight='weight')
+
+def test_split_network():
+    network = tram.readTramNetwork()
+    assert len(network.components()) == 1
+    # only the stops of lines 1 and 2 are still connected
+    network.remove_lines([line for line in network.all_lines() if line not in ['1', '2']])
+    stops = set(network.line_stops('1')) | set(network.line_stops('2'))
+    components = network.components()
+    assert components[0] == stops
+    a, b = min(components[0]), min(components[-1])
+    assert not network.same_component(a, b)
+    assert network.quickest_route(a, b) == (None, float('inf'))
+    assert network.shortest_route(a, b) == (None, float('inf'))
+
+def test_line_travel_time():
+    network = tram.readTramNetwork()
+    with open('./tramnetwork.json', 'r', encoding='utf-8') as jfile:
+        tramdict = json.load(jfile)
+    for line in network.all_lines():
+        stops = network.line_stops(line)
+        for a in stops:
+            for b in stops[::3]:
+                if a != b:
+                    assert network.line_travel_time(line, a, b) == tramdata.time_between_stops(tramdict, line, a, b)
+        # the time of the whole line is the sum of its transition times
+        assert network.line_travel_time(line, stops[0], stops[-1]) == \
+            sum(network.transition_time(u, v) for u, v in zip(stops, stops[1:]))
+    assert network.line_travel_time('80', 'Chalmers', 'Valand') == 'The line 80 is not exist'
+    # the index read from the json file, or built by tramdata when it is missing
+    assert network._line_index == tramdict['line_index']
+    built = tram.TramNetwork(tramdict['lines'], tramdict['stops'], tramdict['times'])
+    assert built._line_index == {}
+    for line in network.all_lines():
+        stops = network.line_stops(line)
+        assert built.line_travel_time(line, stops[0], stops[-1]) == network.line_travel_time(line, stops[0], stops[-1])
+    assert built._line_index == tramdata.build_line_index(tramdict['lines'], tramdict['times'])
+    # the lines via the stops are in the same order as in the json file
+    for stop in network.all_stops():
+        assert built.stop_lines(stop) == network.stop_lines(stop)
+
+def test_geo_distance_many():
+    network = tram.readTramNetwork()
+    stops = network.all_stops()
+    pairs = [(a, b) for a in stops[::4] for b in stops[::3] if a != b]
+    assert list(network.geo_distance_many(pairs)) == [network.geo_distance(a, b) for a, b in pairs]
+    matrix = network.geo_distance_matrix()
+    assert matrix is network.geo_distance_matrix()
+    assert matrix.shape == (len(stops), len(stops)) and (matrix.diagonal() == 0).all()
+    for i, a in enumerate(stops[::5]):
+        for j, b in enumerate(stops):
+            if a != b:
+                assert matrix[5*i, j] == network.geo_distance(a, b)
+    # the routes use the lengths of the edges computed when the network is read
+    for a, b in network.edges():
+        assert network.get_edge_attribute(a, b, 'distance') == network.geo_distance(a, b)
+    # also on the frozen network
+    frozen = network.freeze()
+    for a in stops[::10]:
+        tree = tram.gr.dijkstra(network, a, weight='distance')
+        frozen_tree = tram.gr.dijkstra(frozen, a, weight='distance')
+        assert {b: frozen_tree.cost(b) for b in frozen_tree} == {b: tree.cost(b) for b in tree}
+    # unknown stops, as in geo_distance, and a network without stops
+    assert network.geo_distance_many([(stops[0], 'Nowhere')]) == "unknown arguments"
+    with open('./tramnetwork.json', 'r', encoding='utf-8') as jfile:
+        tramdict = json.load(jfile)
+    no_stops = tram.TramNetwork(tramdict['lines'], None, tramdict['times'])
+    assert no_stops.geo_distance(stops[0], stops[1]) == "unknown arguments"
+    assert no_stops.get_edge_attribute(*next(iter(no_stops.edges())), 'distance') is None
+
 
 def main():
     test_lines()
     test_stops()
     connectedness_test()
+    test_frozen_network()
+    test_astar_network()
+    test_quickest_route()
+    test_matrices()
+    test_alternative_routes()
+    test_split_network()
+    test_line_travel_time()
+    test_geo_distance_many()
 
 if __name__ == '__main__':
         main()
\ No newline at end of file
@@ -1,3 +1,7 @@
+import io
+import os
+import shutil
+import tempfile
 import unittest
 from tramdata import *
 from haversine import haversine
@@ -54,6 +58,48 @@ class TestTramData(unittest.TestCase):
         self.assertEqual(line_dict, self.linedict)
                     
                     
+    def test_parse_in_one_pass(self):
+        with open(TRAMLINES_FILE, 'r', encoding='utf-8') as f:
+            stops, line_dict, time_dict, line_offsets = parse_tram_lines(f)
+        self.assertEqual(line_dict, self.linedict)
+        self.assertEqual(time_dict, self.timedict)
+        self.assertEqual(set(stops), {stop for line in line_dict.values() for stop in line})
+        for line, offsets in line_offsets.items():
+            self.assertEqual(len(offsets), len(line_dict[line]))
+            self.assertEqual(offsets[0], 0)
+        # a timetable passing midnight, with spaces and tabs in the rows
+        stops, line_dict, time_dict, line_offsets = parse_tram_lines(['1:\n', ' Night  Stop\t23:58\n', '\n', 'Day Stop  0:03\n'])
+        self.assertEqual(line_dict, {'1': ['Night Stop', 'Day Stop']})
+        self.assertEqual(time_dict['Night Stop']['Day Stop'], 5)
+        self.assertEqual(line_offsets, {'1': [0, 5]})
+
+    def test_stop_line_index(self):
+        stop_lines = self.tramdict['stop_lines']
+        self.assertEqual(stop_lines, build_stop_lines(self.linedict))
+        for stop in self.stopdict:
+            lines = [line for line in self.linedict if stop in self.linedict[line]]
+            self.assertEqual(stop_lines.get(stop, []), sorted(lines, key=int))
+        for stop1 in list(self.stopdict)[::7]:
+            for stop2 in list(self.stopdict)[::5]:
+                both = [line for line in self.linedict if stop1 in self.linedict[line] and stop2 in self.linedict[line]]
+                self.assertEqual(intersect_lines(stop_lines[stop1], stop_lines[stop2]), sorted(both, key=int))
+        # line names that are not numbers come last, a line passing a stop twice is listed once
+        self.assertEqual(build_stop_lines({'X': ['a', 'b', 'a'], '10': ['a'], '9': ['b']}),
+                         {'a': ['10', 'X'], 'b': ['9', 'X']})
+        # a json file without the index is indexed when it is first asked
+        tramdict = {key: self.tramdict[key] for key in ['stops', 'lines', 'times']}
+        self.assertEqual(answer_query(tramdict, 'via Chalmers'), ['6', '7', '8', '10', '13'])
+        self.assertEqual(tramdict['stop_lines'], stop_lines)
+
+    def test_line_index(self):
+        self.assertEqual(self.tramdict['line_index'], build_line_index(self.linedict, self.timedict))
+        # a loop line passing B twice: the shortest ride is taken
+        tramdict = {'stops': {stop: {} for stop in 'ABCD'}, 'lines': {'1': ['A', 'B', 'C', 'D', 'B']},
+                    'times': {'A': {'B': 1}, 'B': {'A': 1, 'C': 2, 'D': 3}, 'C': {'B': 2, 'D': 4}, 'D': {'C': 4, 'B': 3}}}
+        self.assertEqual(time_between_stops(tramdict, '1', 'D', 'B'), 3)
+        self.assertEqual(time_between_stops(tramdict, '1', 'A', 'B'), 1)
+        self.assertEqual(time_between_stops(tramdict, '1', 'C', 'A'), 3)
+
     def test_distance_feasible(self):
         threshold = 20
         stops = list(self.stopdict.keys())
@@ -161,6 +207,70 @@ class TestTramData(unittest.TestCase):
         for i in range(len(tests)):
             self.assertEqual(answer_query(self.tramdict, query.format(*tests[i])), answers[i])
     
+    def test_stop_names(self):
+        index = stop_name_index(self.tramdict)
+        self.assertEqual(len(index), len(self.stopdict))
+        self.assertEqual(index.resolve('östra sjukhuset'), 'Östra Sjukhuset')
+        self.assertEqual(index.resolve('OSTRA  SJUKHUSET'), 'Östra Sjukhuset')
+        self.assertEqual(index.prefix('brunns'), ['Brunnsgatan', 'Brunnsparken'])
+        self.assertEqual(index.similar('Chalmrs'), ['Chalmers'])
+        # the queries find the stops in any case and with or without diacritics
+        self.assertEqual(answer_query(self.tramdict, 'via ostra sjukhuset'), answer_query(self.tramdict, 'via Östra Sjukhuset'))
+        self.assertEqual(answer_query(self.tramdict, 'time with 6 from CHALMERS to jarntorget'),
+                         answer_query(self.tramdict, 'time with 6 from Chalmers to Järntorget'))
+        self.assertEqual(answer_query(self.tramdict, 'between Chalmrs and Valand'), 'unknown arguments, did you mean Chalmers?')
+        self.assertEqual(answer_query(self.tramdict, 'via abcdef'), 'unknown arguments')
+        # the index is not kept in the dictionary, which can still be written as json
+        self.assertEqual(json.loads(json.dumps(self.tramdict)), self.tramdict)
+        # a stop renamed in place is found by its new name
+        tramdict = json.loads(json.dumps(self.tramdict))
+        tramdict['stops']['Chalmers Tvärgata'] = tramdict['stops'].pop('Chalmers')
+        self.assertIsNone(stop_name_index(tramdict).resolve('chalmers'))
+        self.assertEqual(stop_name_index(tramdict).resolve('chalmers tvargata'), 'Chalmers Tvärgata')
+
+    def test_batch(self):
+        queries = ['via Chalmers', 'between Chalmers and Valand', 'time with 6 from Chalmers to Järntorget',
+                   'distance from SKF to Korsvägen', 'via abcdef', 'hello'] * 5
+        infile = io.StringIO(''.join(query + '\n' for query in queries))
+        outfile = io.StringIO()
+        counters = batch(TRAM_FILE, infile, outfile, block=4)
+        self.assertEqual((counters['misses'], counters['hits']), (6, 24))
+        answers = [json.loads(line) for line in outfile.getvalue().splitlines()]
+        self.assertEqual(answers, [{'query': query, 'answer': answer_query(self.tramdict, query)} for query in queries])
+        # the same answers in the same order from several processes
+        infile.seek(0)
+        parallel = io.StringIO()
+        batch(TRAM_FILE, infile, parallel, workers=2, block=4)
+        self.assertEqual(parallel.getvalue(), outfile.getvalue())
+
+    def test_query_cache(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            jsonfile = os.path.join(tmp, 'tramnetwork.json')
+            shutil.copy(TRAM_FILE, jsonfile)
+            cache = QueryCache(jsonfile, maxsize=2, check_interval=0)
+            answer = cache.answer('between Chalmers and Valand')
+            self.assertEqual(answer, answer_query(self.tramdict, 'between Chalmers and Valand'))
+            # the same query in other whitespace and case
+            self.assertEqual(cache.answer('  Between chalmers  and VALAND'), answer)
+            self.assertEqual((cache.hits, cache.misses), (1, 1))
+            cache.answer('via Chalmers')
+            cache.answer('between Chalmers and Valand')
+            cache.answer('via Valand')  # evicts 'via Chalmers', the least recently used
+            self.assertEqual((cache.hits, cache.misses, cache.evictions, len(cache)), (2, 3, 1, 2))
+            cache.answer('via Chalmers')
+            self.assertEqual((cache.misses, cache.evictions), (4, 2))
+            self.assertEqual(cache.answer('hello'), 'sorry, try again')
+            self.assertEqual(cache.misses, 5)
+            # changing an answer does not change the cached one
+            cache.answer('via Valand').append('XX')
+            self.assertEqual(cache.answer('via Valand'), answer_query(self.tramdict, 'via Valand'))
+            # a changed file is read again
+            tramdict = {'stops': self.stopdict, 'lines': {'6': ['Chalmers', 'Valand']}, 'times': self.timedict}
+            with open(jsonfile, 'w', encoding='utf-8') as jfile:
+                json.dump(tramdict, jfile, ensure_ascii=False)
+            self.assertEqual(cache.answer('via Chalmers'), ['6'])
+            self.assertEqual((cache.reloads, cache.misses), (1, 7))
+
     def use_haversine_calculate_distance(self, stop1, stop2):
         """using Haversine library to check our own distance-calculation function
 
@@ -0,0 +1,341 @@
+import sys
+from array import array
+from bisect import bisect_left
+import tramdata as td
+
+TRAMLINES_FILE = './data/tramlines.txt'
+
+# trams run every HEADWAY minutes from SERVICE_START to SERVICE_END (minutes after midnight)
+HEADWAY = 10
+SERVICE_START = 5 * 60
+SERVICE_END = 24 * 60
+
+
+def parse_clock(clock):
+    """Converts a clock time to minutes after midnight
+
+    Args:
+        clock (string or number): 'hh:mm', or already a number of minutes
+
+    Returns:
+        int: minutes after midnight
+    """
+    if isinstance(clock, str):
+        h, m = clock.strip().split(':')
+        return int(h) * 60 + int(m)
+    return int(clock)
+
+
+def format_clock(minutes):
+    """Converts minutes after midnight to a clock time 'hh:mm' (hours after 24 are kept for the night after)"""
+    return '{:02d}:{:02d}'.format(int(minutes) // 60, int(minutes) % 60)
+
+
+def build_line_times(lines):
+    """For building up the clock times of each line, as given in tramlines.txt
+
+    Args:
+        lines (iterable of strings): tramlines.txt, e.g. the open file, read by tramdata.parse_tram_lines
+
+    Returns:
+        dictionary:
+            * keys are line names
+            * values are lists of (stop name, minutes after the departure from the first stop),
+              in the order in which the tram runs
+    """
+    _, line_dict, _, line_offsets = td.parse_tram_lines(lines)
+    return {line: list(zip(line_dict[line], line_offsets[line])) for line in line_dict}
+
+
+class Timetable:
+    """
+    The departures of all lines during one day, for earliest arrival queries with the Connection Scan Algorithm.
+    Each line runs in both directions, every headway minutes, with the running times of tramlines.txt.
+    Internal representation:
+        _stops: [stop with id 0, stop with id 1, ...]
+        _stop_ids: {stop: id}
+        _trip_lines: [line of trip 0, line of trip 1, ...]
+        _dep_stop, _arr_stop, _dep_time, _arr_time, _trip: arrays with one entry per connection,
+            i.e. one tram running from a stop to the next one, sorted by the departure time
+    """
+    def __init__(self, line_times, headway=HEADWAY, start=SERVICE_START, end=SERVICE_END):
+        """Generates the departures, headway is the minutes between the trams of a line,
+        or a dictionary {line: minutes} (HEADWAY for the lines not in it)."""
+        self._stops = list()
+        self._stop_ids = dict()
+        self._trip_lines = list()
+        connections = list()
+        for line, times in line_times.items():
+            every = headway.get(line, HEADWAY) if isinstance(headway, dict) else headway
+            ids = [self._stop_id(stop) for stop, _ in times]
+            offsets = [t for _, t in times]
+            total = offsets[-1] if offsets else 0
+            # the way back takes the same times as the way there
+            directions = [(ids, offsets), (ids[::-1], [total - t for t in reversed(offsets)])]
+            for departure in range(parse_clock(start), parse_clock(end), every):
+                for stop_ids, stop_offsets in directions:
+                    trip = len(self._trip_lines)
+                    self._trip_lines.append(line)
+                    for i in range(len(stop_ids) - 1):
+                        connections.append((departure + stop_offsets[i], departure + stop_offsets[i+1],
+                                            trip, i, stop_ids[i], stop_ids[i+1]))
+        # sorting on the arrival, the trip and the position on it too keeps the connections of a trip in order
+        # when some of them take zero minutes
+        connections.sort()
+        # minutes fit in 16 bits, and so do the stop ids of most cities
+        stop_type = 'H' if len(self._stops) < 2**16 else 'i'
+        self._dep_time = array('H', [c[0] for c in connections])
+        self._arr_time = array('H', [c[1] for c in connections])
+        self._trip = array('i', [c[2] for c in connections])
+        self._dep_stop = array(stop_type, [c[4] for c in connections])
+        self._arr_stop = array(stop_type, [c[5] for c in connections])
+
+    def _stop_id(self, stop):
+        if stop not in self._stop_ids:
+            self._stop_ids[stop] = len(self._stops)
+            self._stops.append(stop)
+        return self._stop_ids[stop]
+
+    def __len__(self):
+        "Return the number of connections."
+        return len(self._dep_time)
+
+    def stops(self):
+        "Lists all stops."
+        return list(self._stops)
+
+    def nbytes(self):
+        "Return the memory used by the connection arrays, in bytes."
+        arrays = [self._dep_time, self._arr_time, self._trip, self._dep_stop, self._arr_stop]
+        return sum(a.itemsize * len(a) for a in arrays)
+
+    def _scan(self, dep_stop, dest_stop, depart_at):
+        """The connection scan: one pass over the connections departing after depart_at,
+        returns the earliest arrival at each stop id and the connection it arrives with."""
+        n = len(self._stops)
+        earliest = [float('inf')] * n
+        arrived_by = [-1] * n
+        reached = bytearray(len(self._trip_lines))
+        src, dst = self._stop_ids[dep_stop], self._stop_ids[dest_stop]
+        earliest[src] = depart_at
+        dep_time, arr_time, trip = self._dep_time, self._arr_time, self._trip
+        dep_stops, arr_stops = self._dep_stop, self._arr_stop
+        for c in range(bisect_left(dep_time, depart_at), len(dep_time)):
+            # no later connection can arrive earlier at the destination
+            if earliest[dst] <= dep_time[c]:
+                break
+            if reached[trip[c]] or earliest[dep_stops[c]] <= dep_time[c]:
+                reached[trip[c]] = 1
+                if arr_time[c] < earliest[arr_stops[c]]:
+                    earliest[arr_stops[c]] = arr_time[c]
+                    arrived_by[arr_stops[c]] = c
+        return earliest, arrived_by
+
+    def earliest_arrival(self, dep_stop, dest_stop, depart_at):
+        """The earliest arrival at dest_stop, leaving dep_stop at depart_at or later
+
+        Args:
+            dep_stop (string): departure stop
+            dest_stop (string): destination stop
+            depart_at (string or number): 'hh:mm' or minutes after midnight
+
+        Returns:
+            int: the arrival in minutes after midnight (see format_clock), None if dest_stop can not be reached that day
+        """
+        if dep_stop not in self._stop_ids or dest_stop not in self._stop_ids:
+            return None
+        depart_at = parse_clock(depart_at)
+        earliest, _ = self._scan(dep_stop, dest_stop, depart_at)
+        arrival = earliest[self._stop_ids[dest_stop]]
+        return None if arrival == float('inf') else arrival
+
+    def journey(self, dep_stop, dest_stop, depart_at):
+        """The legs of a journey with the earliest arrival, as in earliest_arrival
+
+        Returns:
+            list: (line, from stop, departure, to stop, arrival) for each tram taken, times in minutes after midnight,
+                  None if dest_stop can not be reached that day
+        """
+        if dep_stop not in self._stop_ids or dest_stop not in self._stop_ids:
+            return None
+        depart_at = parse_clock(depart_at)
+        earliest, arrived_by = self._scan(dep_stop, dest_stop, depart_at)
+        stop = self._stop_ids[dest_stop]
+        if earliest[stop] == float('inf'):
+            return None
+        # follow the connections back, one leg for each trip
+        legs = list()
+        src = self._stop_ids[dep_stop]
+        while stop != src:
+            c = arrived_by[stop]
+            first = c
+            # go back along the same trip as far as it was used
+            while self._dep_stop[first] != src and arrived_by[self._dep_stop[first]] >= 0 \
+                    and self._trip[arrived_by[self._dep_stop[first]]] == self._trip[c]:
+                first = arrived_by[self._dep_stop[first]]
+            legs.append((self._trip_lines[self._trip[c]], self._stops[self._dep_stop[first]], self._dep_time[first],
+                         self._stops[stop], self._arr_time[c]))
+            stop = self._dep_stop[first]
+        legs.reverse()
+        return legs
+
+
+class Raptor:
+    """
+    Round-based routing (RAPTOR) on the lines of a TramNetwork, for journeys that are quick and have few transfers.
+    Each line is two routes, one in each direction, and its trams leave the first stop every headway minutes,
+    as in Timetable. Round k finds the earliest arrivals with k trams.
+    Internal representation:
+        _stops: [stop with id 0, stop with id 1, ...]
+        _stop_ids: {stop: id}
+        _route_lines: [line of route 0, line of route 1, ...]
+        _route_offsets: array, the stops of route r are _route_stops[_route_offsets[r]:_route_offsets[r+1]]
+        _route_stops: array of stop ids, in the order in which the trams run
+        _route_times: array of minutes after the departure from the first stop, aligned with _route_stops
+        _route_headway, _route_trips: arrays, the minutes between the trams of each route and how many there are
+        _stop_offsets: array, the routes through stop s are _stop_routes[_stop_offsets[s]:_stop_offsets[s+1]]
+        _stop_routes, _stop_positions: arrays of the routes through each stop and the position of the stop on them
+    """
+    def __init__(self, network, headway=HEADWAY, start=SERVICE_START, end=SERVICE_END):
+        "Builds the indexes from the lines of the network, headway as in Timetable."
+        self._stops = network.all_stops()
+        self._stop_ids = {stop: i for i, stop in enumerate(self._stops)}
+        self._start = parse_clock(start)
+        end = parse_clock(end)
+        self._route_lines = list()
+        self._route_offsets = array('i', [0])
+        self._route_stops = array('i')
+        self._route_times = array('i')
+        self._route_headway = array('i')
+        self._route_trips = array('i')
+        serving = [list() for _ in self._stops]
+        for line in network.all_lines():
+            stops = network.line_stops(line)
+            every = headway.get(line, HEADWAY) if isinstance(headway, dict) else headway
+            times = [0]
+            for a, b in zip(stops, stops[1:]):
+                times.append(times[-1] + network.transition_time(a, b))
+            # the way back takes the same times as the way there
+            for route_stops, route_times in [(stops, times), (stops[::-1], [times[-1] - t for t in reversed(times)])]:
+                route = len(self._route_lines)
+                self._route_lines.append(line)
+                for i, (stop, t) in enumerate(zip(route_stops, route_times)):
+                    serving[self._stop_ids[stop]].append((route, i))
+                    self._route_stops.append(self._stop_ids[stop])
+                    self._route_times.append(t)
+                self._route_offsets.append(len(self._route_stops))
+                self._route_headway.append(every)
+                self._route_trips.append(len(range(self._start, end, every)))
+        self._stop_offsets = array('i', [0])
+        self._stop_routes = array('i')
+        self._stop_positions = array('i')
+        for routes in serving:
+            for route, i in routes:
+                self._stop_routes.append(route)
+                self._stop_positions.append(i)
+            self._stop_offsets.append(len(self._stop_routes))
+
+    def journeys(self, dep_stop, dest_stop, depart_at, max_transfers=5):
+        """The Pareto set of journeys: each one arrives earlier than all journeys with fewer transfers
+
+        Args:
+            dep_stop (string): departure stop
+            dest_stop (string): destination stop
+            depart_at (string or number): 'hh:mm' or minutes after midnight
+            max_transfers (int, optional): the most transfers to look for. Defaults to 5.
+
+        Returns:
+            list: (arrival, transfers, legs) sorted by the number of transfers, where legs are
+                  (line, from stop, departure, to stop, arrival) for each tram taken, as in Timetable.journey
+        """
+        if dep_stop not in self._stop_ids or dest_stop not in self._stop_ids:
+            return []
+        depart_at = parse_clock(depart_at)
+        if dep_stop == dest_stop:
+            return [(depart_at, 0, [])]
+        src, dst = self._stop_ids[dep_stop], self._stop_ids[dest_stop]
+        inf = float('inf')
+        n = len(self._stops)
+        offsets, route_stops, route_times = self._route_offsets, self._route_stops, self._route_times
+        headways, trips = self._route_headway, self._route_trips
+        # arrivals[k][s] is the earliest arrival at s with at most k trams, best[s] over all rounds,
+        # boarded[k][s] = (route, trip, boarding position, alighting position) when round k improved s
+        arrivals = [[inf] * n]
+        arrivals[0][src] = depart_at
+        best = [inf] * n
+        best[src] = depart_at
+        boarded = [dict()]
+        marked = {src}
+        result = list()
+        for k in range(1, max_transfers + 2):
+            previous = arrivals[-1]
+            current = list(previous)
+            improved = dict()
+            # the first marked position on each route
+            queue = dict()
+            for s in marked:
+                for j in range(self._stop_offsets[s], self._stop_offsets[s+1]):
+                    route, i = self._stop_routes[j], self._stop_positions[j]
+                    if i < queue.get(route, inf):
+                        queue[route] = i
+            marked = set()
+            for route, i in queue.items():
+                first = offsets[route]
+                trip, board = None, None
+                for pos in range(i, offsets[route+1] - first):
+                    s = route_stops[first + pos]
+                    if trip is not None:
+                        arrival = self._start + trip * headways[route] + route_times[first + pos]
+                        if arrival < min(best[s], best[dst]):
+                            current[s] = best[s] = arrival
+                            improved[s] = (route, trip, board, pos)
+                            marked.add(s)
+                    # take an earlier tram, if the stop was reached before it leaves
+                    if previous[s] < inf:
+                        wait = previous[s] - self._start - route_times[first + pos]
+                        earliest = max(0, -(-wait // headways[route]))
+                        if earliest < trips[route] and (trip is None or earliest < trip):
+                            trip, board = earliest, pos
+            arrivals.append(current)
+            boarded.append(improved)
+            if dst in improved:
+                result.append((current[dst], k - 1, self._legs(boarded, k, dst)))
+            if not marked:
+                break
+        return result
+
+    def _legs(self, boarded, k, stop):
+        "Follows the trams of a journey back from the stop reached in round k."
+        legs = list()
+        while k > 0:
+            if stop not in boarded[k]:
+                k -= 1
+                continue
+            route, trip, board, alight = boarded[k][stop]
+            first = self._route_offsets[route]
+            departure = self._start + trip * self._route_headway[route]
+            legs.append((self._route_lines[route], self._stops[self._route_stops[first + board]],
+                         departure + self._route_times[first + board],
+                         self._stops[self._route_stops[first + alight]], departure + self._route_times[first + alight]))
+            stop = self._route_stops[first + board]
+            k -= 1
+        legs.reverse()
+        return legs
+
+
+def read_timetable(tramlines=TRAMLINES_FILE, headway=HEADWAY, start=SERVICE_START, end=SERVICE_END):
+    "Reads the clock times of tramlines.txt and returns the Timetable of a day."
+    with open(tramlines, 'r', encoding='utf-8') as f:
+        return Timetable(build_line_times(f), headway, start, end)
+
+
+if __name__ == '__main__':
+    # e.g. python timetable.py Chalmers Centralstationen 08:05
+    timetable = read_timetable()
+    dep, dest, depart_at = sys.argv[1:4]
+    legs = timetable.journey(dep, dest, depart_at)
+    if legs is None:
+        print('No tram from', dep, 'to', dest, 'after', depart_at)
+    else:
+        for line, a, t, b, u in legs:
+            print('Line', line, ':', a, format_clock(t), '-', b, format_clock(u))
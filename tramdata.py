@@ -1,7 +1,18 @@
+import argparse
 import json
 import math
+import os
 import re
 import sys
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from time import monotonic
+import graphs as gr
+
+# the files saved next to tramnetwork.json, e.g. tramnetwork.ch.json
+HIERARCHY_SUFFIX = '.ch.json'
+TIME_MATRIX_SUFFIX = '.time.bin'
+GEO_MATRIX_SUFFIX = '.geo.bin'
 
 
 def build_tram_stops(jsonobject):
@@ -23,6 +34,61 @@ def build_tram_stops(jsonobject):
     return stop_dict
 
 
+# a line header such as '10:', and a stop row such as 'Chalmers   10:21'
+LINE_HEADER = re.compile(r'\s*(\d{0,2}):\s*$')
+STOP_ROW = re.compile(r'\s*(\S.*\S|\S)[ \t]+(\d+):(\d\d)\s*$')
+
+
+def parse_tram_lines(lines):
+    """Reads tramlines.txt in one pass, row by row, so that the file does not need to fit in memory
+
+    Args:
+        lines (iterable of strings): tramlines.txt, e.g. the open file
+
+    Returns:
+        tuple:
+            * list of stop names, in the order in which they are first seen
+            * the line dictionary, as given by build_tram_lines
+            * the time dictionary, as given by build_tram_times
+            * the clock offsets, a dictionary of lines to the minutes after the departure from the first stop,
+              one for each stop of the line dictionary
+    """
+    line_dict = dict()
+    time_dict = dict()
+    line_offsets = dict()
+    match_row, match_header = STOP_ROW.match, LINE_HEADER.match
+    cur_stops = cur_offsets = None
+    prev_times, prev_minutes = None, 0
+    for row in lines:
+        match = match_row(row)
+        if match is None:
+            match = match_header(row)
+            if match:
+                cur_stops = line_dict.setdefault(match.group(1), list())
+                cur_offsets = line_offsets.setdefault(match.group(1), list())
+                prev_times = None
+            continue
+        if cur_stops is None:
+            continue
+        stop, h, m = match.groups()
+        if '  ' in stop or '\t' in stop:
+            stop = ' '.join(stop.split())
+        minutes = int(h) * 60 + int(m)
+        cur_stops.append(stop)
+        times = time_dict.get(stop)
+        if times is None:
+            times = time_dict[stop] = dict()
+        if prev_times is not None:
+            # the times of a line may pass midnight
+            times[prev_stop] = prev_times[stop] = (minutes - prev_minutes) % (24 * 60)
+            cur_offsets.append(cur_offsets[-1] + times[prev_stop])
+        else:
+            cur_offsets.append(cur_offsets[-1] if cur_offsets else 0)
+        prev_stop, prev_times, prev_minutes = stop, times, minutes
+    # the stops are first seen in the order of the time dictionary
+    return list(time_dict), line_dict, time_dict, line_offsets
+
+
 def build_tram_lines(lines):
     """For buidling up the line dictionary
 
@@ -34,21 +100,7 @@ def build_tram_lines(lines):
             * keys are names (usually consisting of digits, but to be treated as strings)
             * values are lists of stop names, in the order in which the tram runs
     """
-    line_dict = dict()
-    cur_tram = None
-    cur_stop = None
-    for line in lines:
-        line_list = line.split()
-        if line_list:
-            match = re.match(r'\d{0,2}:', line_list[0])
-            if match and line_list[0][:-1] not in line_dict:
-                cur_tram = line_list[0][:-1]
-                line_dict[cur_tram] = list()
-                continue
-            if cur_tram:
-                cur_stop = ' '.join(line_list[:-1])
-                line_dict[cur_tram].append(cur_stop)
-    return line_dict
+    return parse_tram_lines(lines)[1]
 
 
 def build_tram_times(lines):
@@ -62,59 +114,176 @@ def build_tram_times(lines):
             * keys are stop names
             * values are dictionaries from stop names to numbers of minutes
     """
-    time_dict = dict()
-    # Initialization temp values
-    cur_tram = None
-    cur_stop, prev_stop = None, None
-    h, m, ph, pm = 0, 0, 0, 0
-    # indicating if it is reading info for a new tram line
-    new_line = False
-    for line in lines:
-        line_list = line.split()
-        if line_list:
-            match = re.match(r'\d{0,2}:', line_list[0])
-            if match and line_list[0][:-1] != cur_tram:
-                cur_tram = line_list[0][:-1]
-                new_line = True
-                continue
-            if new_line:
-                cur_stop, prev_stop = None, None
-                new_line = False
-                h, m, ph, pm = 0, 0, 0, 0
-            if cur_tram:
-                cur_stop = ' '.join(line_list[:-1])
-                if cur_stop not in time_dict:
-                    time_dict[cur_stop] = dict()
-                h, m = line_list[-1].split(':')
-                h, m = int(h), int(m)
-                if prev_stop:
-                    time_dict[prev_stop][cur_stop] = (h-ph)*60 + m-pm
-                    time_dict[cur_stop][prev_stop] = (h-ph)*60 + m-pm
-                prev_stop = cur_stop
-                ph, pm = h, m
-    return time_dict
-
-
-def build_tram_network(transtops, tramlines):
-    """Puts everything together, reads two input files and writes a third json file containing one big dictionary
+    return parse_tram_lines(lines)[2]
+
+
+def line_key(line):
+    "Sorts line names as numbers, the names that are not numbers after them."
+    return (0, int(line), '') if line.isdigit() else (1, 0, line)
+
+
+def build_stop_lines(line_dict):
+    """For building up the inverted index from stops to lines
+
+    Args:
+        line_dict (dictionary): the line dictionary given by build_tram_lines
+
+    Returns:
+        dictionary:
+            * keys are stop names
+            * values are lists of the lines via the stop, sorted by line_key
+    """
+    stop_lines = dict()
+    for line in sorted(line_dict, key=line_key):
+        for stop in line_dict[line]:
+            lines = stop_lines.setdefault(stop, list())
+            # a line can pass a stop twice
+            if not lines or lines[-1] != line:
+                lines.append(line)
+    return stop_lines
+
+
+def stop_line_index(tramdict):
+    "Returns the index from stops to lines stored in tramnetwork.json, built once if the file does not have it."
+    if 'stop_lines' not in tramdict:
+        tramdict['stop_lines'] = build_stop_lines(tramdict['lines'])
+    return tramdict['stop_lines']
+
+
+def intersect_lines(lines1, lines2):
+    "The lines in both lists, by merging the two lists sorted by line_key."
+    both = list()
+    i, j = 0, 0
+    while i < len(lines1) and j < len(lines2):
+        if lines1[i] == lines2[j]:
+            both.append(lines1[i])
+            i += 1
+            j += 1
+        elif line_key(lines1[i]) < line_key(lines2[j]):
+            i += 1
+        else:
+            j += 1
+    return both
+
+
+def build_line_index(line_dict, time_dict):
+    """For building up the positions of the stops on each line and the travel times from the first stop
+
+    Args:
+        line_dict (dictionary): the line dictionary given by build_tram_lines
+        time_dict (dictionary): the time dictionary given by build_tram_times
+
+    Returns:
+        dictionary:
+            * keys are line names
+            * values are dictionaries with 'positions', from stop names to the lists of their positions on the line
+              (a line can pass a stop twice), and 'times', the list of minutes from the first stop to each position
+    """
+    line_index = dict()
+    for line, stops in line_dict.items():
+        positions = dict()
+        times = [0]
+        for i, stop in enumerate(stops):
+            positions.setdefault(stop, list()).append(i)
+            if i > 0:
+                times.append(times[-1] + time_dict[stops[i-1]][stop])
+        line_index[line] = {'positions': positions, 'times': times}
+    return line_index
+
+
+def line_index(tramdict):
+    "Returns the line positions and times stored in tramnetwork.json, built once if the file does not have them."
+    if 'line_index' not in tramdict:
+        tramdict['line_index'] = build_line_index(tramdict['lines'], tramdict['times'])
+    return tramdict['line_index']
+
+
+def stop_name_index(tramdict):
+    """Returns the index of the stop names (a NameIndex) of a network.
+
+    The index is not kept in the dictionary, which can still be written as json, nor cached by the
+    identity of the dictionary, which can change in place: QueryCache keeps it with the network it loads.
+    """
+    return gr.NameIndex(tramdict['stops'])
+
+
+def build_tram_network(transtops, tramlines, outfile='tramnetwork.json'):
+    """Puts everything together, reads two input files and writes a third json file containing one big dictionary,
+    the contraction hierarchy and the all-pairs tables of the network are saved next to it
 
     Args:
         transtops (json object): tramstops.json
         tramlines (a read txt file): tramlines.txt
+        outfile (string, optional): the json file to write. Defaults to 'tramnetwork.json'.
     """
     with open(transtops, 'r', encoding='utf-8') as jfile:
         jsonobject = json.load(jfile)
     with open(tramlines, 'r', encoding='utf-8') as f:
-        lines = f.readlines()
+        _, line_dict, time_dict, _ = parse_tram_lines(f)
     stop_dict = build_tram_stops(jsonobject)
-    line_dict = build_tram_lines(lines)
-    time_dict = build_tram_times(lines)
 
-    output_dict = {'stops': stop_dict, 'lines': line_dict, 'times': time_dict}
+    output_dict = {'stops': stop_dict, 'lines': line_dict, 'times': time_dict,
+                   'stop_lines': build_stop_lines(line_dict), 'line_index': build_line_index(line_dict, time_dict)}
     
-    with open('tramnetwork.json', 'w') as jfile:
+    with open(outfile, 'w') as jfile:
         json.dump(output_dict, jfile, indent=4)
 
+    base = os.path.splitext(outfile)[0]
+    build_tram_hierarchy(stop_dict, time_dict).save(base + HIERARCHY_SUFFIX)
+    time_paths, geo_paths = build_tram_matrices(stop_dict, time_dict)
+    time_paths.save(base + TIME_MATRIX_SUFFIX)
+    geo_paths.save(base + GEO_MATRIX_SUFFIX)
+
+
+def build_tram_graph(stop_dict, time_dict):
+    """Builds the weighted graph of the network, used for preprocessing
+
+    Args:
+        stop_dict (dictionary): the stop dictionary given by build_tram_stops
+        time_dict (dictionary): the time dictionary given by build_tram_times
+
+    Returns:
+        WeightedGraph: stops as vertices, adjacent stops as edges, and times as weights
+    """
+    graph = gr.WeightedGraph()
+    for stop in stop_dict:
+        graph.add_vertex(stop)
+    for stop1 in time_dict:
+        for stop2 in time_dict[stop1]:
+            graph.add_edge(stop1, stop2)
+            graph.set_weight(stop1, stop2, time_dict[stop1][stop2])
+    return graph
+
+
+def build_tram_hierarchy(stop_dict, time_dict):
+    """Preprocesses the network for fast quickest-route queries
+
+    Args:
+        stop_dict (dictionary): the stop dictionary given by build_tram_stops
+        time_dict (dictionary): the time dictionary given by build_tram_times
+
+    Returns:
+        ContractionHierarchy: the contraction hierarchy of the network with travel times as costs
+    """
+    return gr.ContractionHierarchy(build_tram_graph(stop_dict, time_dict), weight='weight')
+
+
+def build_tram_matrices(stop_dict, time_dict):
+    """Precomputes the shortest travel times and geographic distances between all pairs of stops
+
+    Args:
+        stop_dict (dictionary): the stop dictionary given by build_tram_stops
+        time_dict (dictionary): the time dictionary given by build_tram_times
+
+    Returns:
+        tuple: AllPairsPaths with travel times as costs, and AllPairsPaths with distances (Km) as costs
+    """
+    graph = build_tram_graph(stop_dict, time_dict)
+    tramdict = {'stops': stop_dict}
+    time_paths = gr.AllPairsPaths(graph, weight='weight')
+    geo_paths = gr.AllPairsPaths(graph, cost=lambda u, v: distance_between_stops(tramdict, u, v))
+    return time_paths, geo_paths
+
 
 def line_exist(tramdict, line):
     """Check if the request line exist
@@ -154,10 +323,7 @@ def lines_via_stop(tramdict, stop):
     """
     if not stop_exist(tramdict, stop):
         return "unknown arguments"
-    line_dict = tramdict['lines']
-    lines = [line for line in line_dict if stop in line_dict[line]]
-    lines.sort(key=lambda a: int(a))
-    return lines
+    return list(stop_line_index(tramdict).get(stop, []))
 
 
 def lines_between_stops(tramdict, stop1, stop2): 
@@ -175,10 +341,8 @@ def lines_between_stops(tramdict, stop1, stop2):
         return "unknown arguments"
     if stop1 == stop2:
         return("Please enter two different stops!")
-    line_dict = tramdict['lines']
-    lines = [line for line in line_dict if stop1 in line_dict[line] and stop2 in line_dict[line]]
-    lines.sort(key=lambda a: int(a))
-    return lines
+    stop_lines = stop_line_index(tramdict)
+    return intersect_lines(stop_lines.get(stop1, []), stop_lines.get(stop2, []))
 
 
 def time_between_stops(tramdict, line, stop1, stop2):
@@ -199,21 +363,12 @@ def time_between_stops(tramdict, line, stop1, stop2):
         return "unknown arguments"
     if stop1 == stop2:
         return("Please enter two different stops!")
-    line_dict = tramdict['lines']
-    time_dict = tramdict['times']
-    time = 0
-    index1 = line_dict[line].index(stop1)
-    index2 = line_dict[line].index(stop2)
-    if index1 < index2:
-        stops = line_dict[line][index1:index2+1]
-    else:
-        l = len(line_dict[line])
-        stops = line_dict[line][index1-l:index2-l-1:-1]
-    stop = stops[0]
-    for next_stop in stops[1:]:
-        time += time_dict[stop][next_stop]
-        stop = next_stop
-    return time
+    index = line_index(tramdict)[line]
+    positions, times = index['positions'], index['times']
+    if stop1 not in positions or stop2 not in positions:
+        return "unknown arguments"
+    # a subtraction of the times from the first stop, the shortest ride if the line passes a stop twice
+    return min(abs(times[j] - times[i]) for i in positions[stop1] for j in positions[stop2])
 
 
 def distance_between_stops(tramdict, stop1, stop2):
@@ -248,56 +403,263 @@ def distance_between_stops(tramdict, stop1, stop2):
 
 
 def dialogue(jsonfile):
-    with open(jsonfile, 'r') as jfile:
-        tramdict = json.load(jfile)
+    cache = QueryCache(jsonfile)
     while(1):
         query = input("> ")
         if query == 'quit':
             break
-        answer = answer_query(tramdict, query)
+        answer = cache.answer(query)
         print(answer)
 
 
+# the four kinds of queries in one pattern, tried in this order, with the keywords in any case
+QUERY = re.compile(r"via (?P<via>.+)"
+                   r"|between (?P<between1>.+) and (?P<between2>.+)"
+                   r"|time with (?P<line>.+) from (?P<time1>.+) to (?P<time2>.+)"
+                   r"|distance from (?P<distance1>.+) to (?P<distance2>.+)", re.IGNORECASE)
+
+# the query function and its arguments for the last group of each kind of query
+QUERY_FUNCTIONS = {
+    'via': (lines_via_stop, ('via',)),
+    'between2': (lines_between_stops, ('between1', 'between2')),
+    'time2': (time_between_stops, ('line', 'time1', 'time2')),
+    'distance2': (distance_between_stops, ('distance1', 'distance2')),
+}
+
+
+def parse_query(query):
+    """Finds the kind of a query and its arguments, with runs of whitespace read as one space
+
+    Args:
+        query (string): e.g. "between  Chalmers and Valand "
+
+    Returns:
+        tuple: the kind of query ('via', 'between2', 'time2' or 'distance2') and its arguments,
+               e.g. ('between2', ('Chalmers', 'Valand')), or None if it is not a query
+    """
+    match = QUERY.match(' '.join(query.split()))
+    if not match:
+        return None
+    kind = match.lastgroup
+    return kind, tuple(match.group(group) for group in QUERY_FUNCTIONS[kind][1])
+
+
+def resolve_stops(tramdict, parsed, index=None):
+    """Replaces the stop names of a parsed query by the stops they name, in any case and with or without diacritics
+
+    Args:
+        tramdict (dictionary): generated comprehensive dictionary stored in tramnetwork.json
+        parsed (tuple): a query given by parse_query
+        index (NameIndex, optional): the index of the stop names. Defaults to a new stop_name_index(tramdict).
+
+    Returns:
+        tuple: the query with the stops found, e.g. ('via', ('Östra Sjukhuset',)) for 'via ostra sjukhuset',
+               and the list of the names that are not stops
+    """
+    kind, args = parsed
+    if index is None:
+        index = stop_name_index(tramdict)
+    resolved, unknown = list(), list()
+    for group, arg in zip(QUERY_FUNCTIONS[kind][1], args):
+        if group != 'line':
+            stop = index.resolve(arg)
+            if stop is None:
+                unknown.append(arg)
+            else:
+                arg = stop
+        resolved.append(arg)
+    return (kind, tuple(resolved)), unknown
+
+
+def _answer_resolved(tramdict, resolved, unknown, index=None):
+    if unknown:
+        # the stops meant by a name with typos, if there are any close enough
+        similar = (index if index is not None else stop_name_index(tramdict)).similar(unknown[0])
+        if similar:
+            return "unknown arguments, did you mean {}?".format(' or '.join(similar[:3]))
+        return "unknown arguments"
+    kind, args = resolved
+    result = QUERY_FUNCTIONS[kind][0](tramdict, *args)
+    return result if result else "unknown arguments"
+
+
+def _answer_parsed(tramdict, parsed):
+    if parsed is None:
+        return "sorry, try again"
+    return _answer_resolved(tramdict, *resolve_stops(tramdict, parsed))
+
+
 def answer_query(tramdict, query):
-    
-    def pack_args(func_num, args_messy):
-        if func_num == 0:
-            return (None, args_messy, None)
-        elif func_num == 1 or func_num == 3:
-            return (None, args_messy[0], args_messy[1])
+    return _answer_parsed(tramdict, parse_query(query))
+
+
+class QueryCache:
+    """
+    Answers queries on a tramnetwork.json like answer_query, remembering the answers of the
+    maxsize most recently used queries. A query is looked up before it is parsed, by its words
+    in lower case, so that e.g. "Between  chalmers and VALAND" and "between Chalmers and Valand"
+    are the same query (unless case tells stops or lines apart, then the case is kept).
+    The file is read again, and the answers forgotten, when it has changed since it was read;
+    this is checked at most once every check_interval seconds.
+    Counters:
+        hits, misses: queries answered from the cache and by answer_query
+        evictions: answers dropped to keep at most maxsize of them
+        reloads: times the file was read because it had changed
+    """
+    COUNTERS = ('hits', 'misses', 'evictions', 'reloads')
+
+    def __init__(self, jsonfile, maxsize=1024, check_interval=1.0):
+        self.jsonfile = jsonfile
+        self.maxsize = maxsize
+        self.check_interval = check_interval
+        self.tramdict = None
+        self.stop_index = None
+        self._signature = None
+        self._next_check = 0.0
+        self._fold = True
+        self._answers = OrderedDict()
+        for counter in self.COUNTERS:
+            setattr(self, counter, 0)
+        self._load()
+
+    def __len__(self):
+        return len(self._answers)
+
+    def __str__(self):
+        "Shows the counters."
+        return ', '.join('{}: {}'.format(counter, getattr(self, counter)) for counter in self.COUNTERS)
+
+    def as_dict(self):
+        "Returns the counters as a dictionary."
+        return {counter: getattr(self, counter) for counter in self.COUNTERS}
+
+    def hit_rate(self):
+        "The share of the queries answered from the cache."
+        queries = self.hits + self.misses
+        return self.hits / queries if queries else 0.0
+
+    def clear(self):
+        "Forgets the answers, but keeps the counters."
+        self._answers.clear()
+
+    def _load(self):
+        "Reads the file if it is new or has changed, judged by its modification time and size."
+        self._next_check = monotonic() + self.check_interval
+        stat = os.stat(self.jsonfile)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if signature == self._signature:
+            return
+        with open(self.jsonfile, 'r', encoding='utf-8') as jfile:
+            self.tramdict = json.load(jfile)
+        self.stop_index = stop_name_index(self.tramdict)
+        # the queries can be folded to lower case when no two stops differ only in case (or diacritics),
+        # and the lines, which are matched exactly, have no upper case letters
+        stops = self.tramdict['stops']
+        self._fold = (len({gr.normalize_name(stop) for stop in stops}) == len(stops) and
+                      all(line.casefold() == line for line in self.tramdict['lines']))
+        if self._signature is not None:
+            self.reloads += 1
+        self._signature = signature
+        self._answers.clear()
+
+    def answer(self, query):
+        if monotonic() >= self._next_check:
+            self._load()
+        key = ' '.join(query.split())
+        if self._fold:
+            key = key.casefold()
+        answers = self._answers
+        answer = answers.get(key)
+        if answer is not None:
+            self.hits += 1
+            answers.move_to_end(key)
         else:
-            return args_messy
-    
-    def request_for_func(func_num, line=None, stop1=None, stop2=None):
-        funcs = {
-            0: lines_via_stop,
-            1: lines_between_stops,
-            2: time_between_stops,
-            3: distance_between_stops
-        }
-        args_format = {
-            0: [stop1],
-            1: [stop1, stop2],
-            2: [line, stop1, stop2],
-            3: [stop1, stop2]
-        }
-        func = funcs.get(func_num, "Invalid Function request")
-        args = args_format.get(func_num, "Invalid Argument request")
-        return func(tramdict, *args)
-    
-    re0 = r"via (.+)"
-    re1 = r"between (.+) and (.+)"
-    re2 = r"time with (.+) from (.+) to (.+)"
-    re3 = r"distance from (.+) to (.+)"
-    res = [re0, re1, re2, re3]
+            self.misses += 1
+            parsed = parse_query(query)
+            if parsed is None:
+                answer = "sorry, try again"
+            else:
+                answer = _answer_resolved(self.tramdict, *resolve_stops(self.tramdict, parsed, self.stop_index),
+                                          index=self.stop_index)
+            answers[key] = answer
+            if len(answers) > self.maxsize:
+                answers.popitem(last=False)
+                self.evictions += 1
+        # a copy, so that changing an answer does not change the cached one
+        return list(answer) if isinstance(answer, list) else answer
+
+
+def answer_lines(answer, queries):
+    """The answers to the queries as JSON lines, one {'query': ..., 'answer': ...} for each query,
+    answered by answer(query), e.g. QueryCache.answer."""
+    return [json.dumps({'query': query, 'answer': answer(query)}, ensure_ascii=False) + '\n'
+            for query in queries]
+
+
+def batch(jsonfile, infile, outfile, workers=None, block=10000, cache_size=1024):
+    """Answers all queries of a file, one query per line, without the dialogue
 
-    for i, cur_re in enumerate(res):
-        match = re.match(cur_re, query)
-        if match:
-            arguments = re.findall(cur_re, query)
-            result = request_for_func(i, *pack_args(i, *arguments))
-            return result if result else "unknown arguments"
-    return "sorry, try again"
+    Args:
+        jsonfile (string): tramnetwork.json
+        infile (file): the queries, e.g. an open file or sys.stdin, read a block at a time
+        outfile (file): where the answers are written as JSON lines, in the order of the queries
+        workers (int, optional): the number of processes answering the queries, no processes if None. Defaults to None.
+        block (int, optional): the number of queries given to a process at a time. Defaults to 10000.
+        cache_size (int, optional): the number of answers each process remembers. Defaults to 1024.
+
+    Returns:
+        dict: the counters of the caches, added up over the processes
+    """
+    blocks = _query_blocks(infile, block)
+    if workers is None:
+        cache = QueryCache(jsonfile, cache_size)
+        for queries in blocks:
+            outfile.writelines(answer_lines(cache.answer, queries))
+        return cache.as_dict()
+    # the processes read the json file once, and each one is given blocks of queries;
+    # only a few blocks for each process are read ahead, so that the file does not need to fit in memory
+    counters = dict.fromkeys(QueryCache.COUNTERS, 0)
+    def write(future):
+        lines, block_counters = future.result()
+        outfile.writelines(lines)
+        for counter, value in block_counters.items():
+            counters[counter] += value
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_query_worker,
+                             initargs=(jsonfile, cache_size)) as executor:
+        pending = list()
+        for queries in blocks:
+            pending.append(executor.submit(_answer_block, queries))
+            if len(pending) >= 2 * workers:
+                write(pending.pop(0))
+        for future in pending:
+            write(future)
+    return counters
+
+
+def _query_blocks(infile, block):
+    queries = list()
+    for line in infile:
+        queries.append(line.rstrip('\r\n'))
+        if len(queries) == block:
+            yield queries
+            queries = list()
+    if queries:
+        yield queries
+
+
+# the cache of each batch process, made by _init_query_worker
+_worker_cache = None
+
+def _init_query_worker(jsonfile, cache_size):
+    global _worker_cache
+    _worker_cache = QueryCache(jsonfile, cache_size)
+
+
+def _answer_block(queries):
+    "The answers to a block of queries, and how the counters of the cache changed while answering them."
+    before = _worker_cache.as_dict()
+    lines = answer_lines(_worker_cache.answer, queries)
+    return lines, {counter: value - before[counter] for counter, value in _worker_cache.as_dict().items()}
 
 
 if __name__ == '__main__':
@@ -305,6 +667,22 @@ if __name__ == '__main__':
         transtops = './data/tramstops.json'
         tramlines = './data/tramlines.txt'
         build_tram_network(transtops, tramlines)
+    elif sys.argv[1:2] == ['query']:
+        # e.g. python tramdata.py query --file queries.txt --workers 4, or the queries from stdin
+        parser = argparse.ArgumentParser(prog='tramdata.py query')
+        parser.add_argument('--file', help='the queries, one per line (default: stdin)')
+        parser.add_argument('--workers', type=int, help='answer in this many processes')
+        parser.add_argument('--cache-size', type=int, default=1024, help='answers remembered by each process')
+        parser.add_argument('--stats', action='store_true', help='show the counters of the caches on stderr')
+        args = parser.parse_args(sys.argv[2:])
+        jsonfile = './tramnetwork.json'
+        if args.file:
+            with open(args.file, 'r', encoding='utf-8') as infile:
+                counters = batch(jsonfile, infile, sys.stdout, args.workers, cache_size=args.cache_size)
+        else:
+            counters = batch(jsonfile, sys.stdin, sys.stdout, args.workers, cache_size=args.cache_size)
+        if args.stats:
+            print(', '.join('{}: {}'.format(counter, value) for counter, value in counters.items()), file=sys.stderr)
     else:
         jsonfile = './tramnetwork.json'
         dialogue(jsonfile)
\ No newline at end of file